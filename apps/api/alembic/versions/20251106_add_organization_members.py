@@ -48,15 +48,18 @@ def upgrade() -> None:
 
     # Backfill: Add all organization owners to organization_members with owner role
     # This maintains the hybrid ownership pattern (owner_id + membership)
+    # No ON CONFLICT needed: the table was just created empty and each
+    # organization has a single owner_id, so the source cannot yield duplicates.
+    # Joining users lets the planner validate owners with one hash/merge join
+    # instead of a per-row FK lookup (the join also excludes NULL owner_id).
     op.execute("""
         INSERT INTO organization_members (organization_id, user_id, organization_role)
         SELECT
             o.id,
-            o.owner_id,
+            u.id,
             'owner'::organization_role
         FROM organizations o
-        WHERE o.owner_id IS NOT NULL
-        ON CONFLICT DO NOTHING;
+        JOIN users u ON u.id = o.owner_id;
     """)
 
 
@@ -12,6 +12,7 @@ Create Date: 2025-11-06 10:00:00
 
 """
 from typing import Sequence, Union
+import uuid
 
 from alembic import op
 import sqlalchemy as sa
@@ -31,9 +32,11 @@ def upgrade() -> None:
     Migration steps:
     1. Create organizations table
     2. Add organization_id to spaces and threads
-    3. Backfill organization_id (create default org)
+    3. Default organization_id to a newly created default org
     4. Rename Query → Thread (tables, columns, enums, constraints)
     5. Make space_id optional in threads
+    6. Validate foreign keys and index organization_id concurrently
+       (outside the transaction)
     """
 
     # ========================================
@@ -60,40 +63,38 @@ def upgrade() -> None:
     # PART 2: Add organization_id to spaces
     # ========================================
 
-    # Add organization_id column to spaces (nullable initially)
-    op.add_column('spaces', sa.Column('organization_id', postgresql.UUID(as_uuid=True), nullable=True))
-
-    # Create a default organization for existing spaces
-    op.execute("""
+    # Create a default organization for existing spaces. Its id is generated
+    # here rather than read back with RETURNING, so the same literal can be
+    # used in the DDL below and `alembic upgrade --sql` (offline) still works.
+    default_org_id = uuid.uuid4()
+    op.execute(f"""
         INSERT INTO organizations (id, name, slug, owner_id)
         SELECT
-            gen_random_uuid(),
+            '{default_org_id}',
             'Default Organization',
             'default-org',
-            (SELECT id FROM users ORDER BY created_at ASC LIMIT 1)
-        ON CONFLICT DO NOTHING;
+            (SELECT id FROM users ORDER BY created_at ASC LIMIT 1);
     """)
 
-    # Backfill organization_id for all spaces
-    op.execute("""
-        UPDATE spaces
-        SET organization_id = (SELECT id FROM organizations WHERE slug = 'default-org')
-        WHERE organization_id IS NULL;
+    # Add organization_id to spaces with the default org as a constant default.
+    # On PG 11+ this is metadata-only: existing rows are backfilled without a
+    # table rewrite and NOT NULL needs no separate verification scan.
+    op.execute(f"""
+        ALTER TABLE spaces
+        ADD COLUMN organization_id uuid NOT NULL DEFAULT '{default_org_id}';
     """)
 
-    # Make organization_id NOT NULL after backfill
-    op.alter_column('spaces', 'organization_id', nullable=False)
+    # New spaces must specify their organization explicitly
+    op.execute("ALTER TABLE spaces ALTER COLUMN organization_id DROP DEFAULT;")
 
-    # Add foreign key constraint
-    op.create_foreign_key(
-        'fk_spaces_organization_id',
-        'spaces', 'organizations',
-        ['organization_id'], ['id'],
-        ondelete='CASCADE'
-    )
-
-    # Create index for spaces.organization_id
-    op.create_index('idx_spaces_organization_id', 'spaces', ['organization_id'])
+    # Add foreign key constraint NOT VALID: ADD COLUMN already holds ACCESS
+    # EXCLUSIVE until COMMIT, so existing rows are validated in Part 5 instead
+    op.execute("""
+        ALTER TABLE spaces
+        ADD CONSTRAINT fk_spaces_organization_id
+        FOREIGN KEY (organization_id) REFERENCES organizations(id) ON DELETE CASCADE
+        NOT VALID;
+    """)
 
 
     # ========================================
@@ -110,68 +111,89 @@ def upgrade() -> None:
     # Step 3: Rename columns in thread_documents
     op.alter_column('thread_documents', 'query_id', new_column_name='thread_id')
 
-    # Step 4: Rename foreign key constraints (using SQLAlchemy ops)
+    # Step 4: Replace the foreign key under its new name, gaining ON DELETE
+    # CASCADE. The rename above already holds ACCESS EXCLUSIVE on the table
+    # until COMMIT, so add it NOT VALID here and validate it in Part 5, after
+    # this transaction commits, where VALIDATE only takes SHARE UPDATE EXCLUSIVE.
     op.drop_constraint('query_documents_query_id_fkey', 'thread_documents', type_='foreignkey')
-    op.create_foreign_key(
-        'thread_documents_thread_id_fkey',
-        'thread_documents', 'threads',
-        ['thread_id'], ['id'],
-        ondelete='CASCADE'
-    )
-
-    # Step 5: Rename indexes
-    # Threads table indexes
-    op.execute("ALTER INDEX IF EXISTS idx_queries_space_id RENAME TO idx_threads_space_id;")
-    op.execute("ALTER INDEX IF EXISTS idx_queries_created_by RENAME TO idx_threads_created_by;")
-    op.execute("ALTER INDEX IF EXISTS idx_queries_status RENAME TO idx_threads_status;")
+    op.execute("""
+        ALTER TABLE thread_documents
+        ADD CONSTRAINT thread_documents_thread_id_fkey
+        FOREIGN KEY (thread_id) REFERENCES threads(id) ON DELETE CASCADE
+        NOT VALID;
+    """)
 
-    # Thread documents table indexes
-    op.execute("ALTER INDEX IF EXISTS idx_query_documents_query_id RENAME TO idx_thread_documents_thread_id;")
-    op.execute("ALTER INDEX IF EXISTS idx_query_documents_document_id RENAME TO idx_thread_documents_document_id;")
+    # Step 5: Rename indexes (single DO block = one round-trip)
+    op.execute("""
+        DO $$
+        BEGIN
+            -- Threads table indexes
+            ALTER INDEX IF EXISTS idx_queries_space_id RENAME TO idx_threads_space_id;
+            ALTER INDEX IF EXISTS idx_queries_created_by RENAME TO idx_threads_created_by;
+            ALTER INDEX IF EXISTS idx_queries_status RENAME TO idx_threads_status;
+
+            -- Thread documents table indexes
+            ALTER INDEX IF EXISTS idx_query_documents_query_id RENAME TO idx_thread_documents_thread_id;
+            ALTER INDEX IF EXISTS idx_query_documents_document_id RENAME TO idx_thread_documents_document_id;
+        END
+        $$;
+    """)
 
 
     # ========================================
     # PART 4: Add organization_id to threads
     # ========================================
 
-    # Add organization_id column to threads (nullable initially)
-    op.add_column('threads', sa.Column('organization_id', postgresql.UUID(as_uuid=True), nullable=True))
-
-    # Backfill organization_id from spaces
-    op.execute("""
-        UPDATE threads t
-        SET organization_id = s.organization_id
-        FROM spaces s
-        WHERE t.space_id = s.id
-        AND t.organization_id IS NULL;
+    # Add organization_id to threads defaulting to the default org (metadata-only).
+    # Every space was just assigned that same org in Part 2, so this already is
+    # each thread's correct organization and no backfill UPDATE is needed.
+    op.execute(f"""
+        ALTER TABLE threads
+        ADD COLUMN organization_id uuid NOT NULL DEFAULT '{default_org_id}';
     """)
 
-    # For threads without space_id (shouldn't exist, but handle gracefully)
+    # New threads must specify their organization explicitly
+    op.execute("ALTER TABLE threads ALTER COLUMN organization_id DROP DEFAULT;")
+
+    # Add foreign key constraint NOT VALID: ADD COLUMN already holds ACCESS
+    # EXCLUSIVE until COMMIT, so existing rows are validated in Part 5 instead
     op.execute("""
-        UPDATE threads
-        SET organization_id = (SELECT id FROM organizations WHERE slug = 'default-org')
-        WHERE organization_id IS NULL;
+        ALTER TABLE threads
+        ADD CONSTRAINT fk_threads_organization_id
+        FOREIGN KEY (organization_id) REFERENCES organizations(id) ON DELETE CASCADE
+        NOT VALID;
     """)
 
-    # Make organization_id NOT NULL after backfill
-    op.alter_column('threads', 'organization_id', nullable=False)
-
-    # Add foreign key constraint
-    op.create_foreign_key(
-        'fk_threads_organization_id',
-        'threads', 'organizations',
-        ['organization_id'], ['id'],
-        ondelete='CASCADE'
-    )
-
-    # Create index for threads.organization_id
-    op.create_index('idx_threads_organization_id', 'threads', ['organization_id'])
-
     # Make space_id optional (nullable) for org-wide threads
     # NOTE: It's already nullable in current schema, this is explicit documentation
     op.alter_column('threads', 'space_id', nullable=True)
 
 
+    # ========================================
+    # PART 5: Validate foreign keys and index organization_id columns
+    # ========================================
+
+    # spaces and threads are already populated, so build these indexes
+    # CONCURRENTLY to avoid blocking writes. CREATE INDEX CONCURRENTLY cannot
+    # run inside a transaction, so commit the work above first. Outside the
+    # migration transaction, each VALIDATE CONSTRAINT scans under SHARE UPDATE
+    # EXCLUSIVE instead of the ACCESS EXCLUSIVE lock the DDL above held.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE spaces VALIDATE CONSTRAINT fk_spaces_organization_id;")
+        op.execute("ALTER TABLE threads VALIDATE CONSTRAINT fk_threads_organization_id;")
+        op.execute(
+            "ALTER TABLE thread_documents VALIDATE CONSTRAINT thread_documents_thread_id_fkey;"
+        )
+        op.create_index(
+            'idx_spaces_organization_id', 'spaces', ['organization_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'idx_threads_organization_id', 'threads', ['organization_id'],
+            postgresql_concurrently=True,
+        )
+
+
 def downgrade() -> None:
     """Revert organization support and Thread → Query naming.
 
@@ -195,20 +217,23 @@ def downgrade() -> None:
     # PART 2: Revert Thread → Query naming
     # ========================================
 
-    # Step 1: Rename indexes back
-    op.execute("ALTER INDEX IF EXISTS idx_threads_space_id RENAME TO idx_queries_space_id;")
-    op.execute("ALTER INDEX IF EXISTS idx_threads_created_by RENAME TO idx_queries_created_by;")
-    op.execute("ALTER INDEX IF EXISTS idx_threads_status RENAME TO idx_queries_status;")
-    op.execute("ALTER INDEX IF EXISTS idx_thread_documents_thread_id RENAME TO idx_query_documents_query_id;")
-    op.execute("ALTER INDEX IF EXISTS idx_thread_documents_document_id RENAME TO idx_query_documents_document_id;")
-
-    # Step 2: Rename foreign key constraints back (using SQLAlchemy ops)
-    op.drop_constraint('thread_documents_thread_id_fkey', 'thread_documents', type_='foreignkey')
-    op.create_foreign_key(
-        'query_documents_query_id_fkey',
-        'thread_documents', 'threads',
-        ['thread_id'], ['id'],
-        ondelete='CASCADE'
+    # Step 1: Rename indexes back (single DO block = one round-trip)
+    op.execute("""
+        DO $$
+        BEGIN
+            ALTER INDEX IF EXISTS idx_threads_space_id RENAME TO idx_queries_space_id;
+            ALTER INDEX IF EXISTS idx_threads_created_by RENAME TO idx_queries_created_by;
+            ALTER INDEX IF EXISTS idx_threads_status RENAME TO idx_queries_status;
+            ALTER INDEX IF EXISTS idx_thread_documents_thread_id RENAME TO idx_query_documents_query_id;
+            ALTER INDEX IF EXISTS idx_thread_documents_document_id RENAME TO idx_query_documents_document_id;
+        END
+        $$;
+    """)
+
+    # Step 2: Rename foreign key constraint back (metadata-only, no revalidation)
+    op.execute(
+        "ALTER TABLE thread_documents "
+        "RENAME CONSTRAINT thread_documents_thread_id_fkey TO query_documents_query_id_fkey;"
     )
 
     # Step 3: Rename columns back
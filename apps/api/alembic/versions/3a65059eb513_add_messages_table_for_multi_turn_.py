@@ -6,7 +6,7 @@ within threads, enabling ChatGPT-style follow-up questions (LOG-207).
 Current model: Thread stores single query + result
 New model: Thread contains multiple messages (user/assistant/system)
 
-Metadata structure in JSONB:
+Metadata structure in JSONB (NULL when a message has no metadata, e.g. user turns):
 {
     "citations": [...],
     "confidence_score": 0.85,
@@ -48,18 +48,14 @@ def upgrade() -> None:
         sa.Column('thread_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('threads.id', ondelete='CASCADE'), nullable=False),
         sa.Column('message_role', message_role_enum, nullable=False),
         sa.Column('content', sa.Text(), nullable=False),
-        sa.Column('metadata', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column('metadata', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
         sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
     )
 
-    # Create indexes for performance
-    op.create_index(
-        'idx_messages_thread_id',
-        'messages',
-        ['thread_id']
-    )
-
+    # Create index for retrieving a thread's messages in order.
+    # The composite index also serves plain thread_id lookups (leftmost prefix),
+    # so no separate single-column thread_id index is needed.
     op.create_index(
         'idx_messages_created_at',
         'messages',
@@ -69,9 +65,8 @@ def upgrade() -> None:
 
 def downgrade() -> None:
     """Drop messages table."""
-    # Drop indexes first
+    # Drop index first
     op.drop_index('idx_messages_created_at', table_name='messages')
-    op.drop_index('idx_messages_thread_id', table_name='messages')
 
     # Drop table (CASCADE constraint will be dropped automatically)
     op.drop_table('messages')
@@ -14,7 +14,6 @@ Revises: 3a65059eb513
 Create Date: 2025-11-15 16:08:09.971988
 
 """
-import json
 from typing import Sequence, Union
 
 from alembic import op
@@ -29,64 +28,87 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    """Migrate existing threads to messages format."""
-    # Get database connection
-    conn = op.get_bind()
-
-    # Fetch all existing threads
-    threads = conn.execute(
-        sa.text("""
-            SELECT id, query_text, result, sources, confidence_score,
-                   created_at, updated_at
-            FROM threads
-            WHERE query_text IS NOT NULL
-        """)
-    ).fetchall()
-
-    # Migrate each thread to messages
-    for thread in threads:
-        thread_id = thread[0]
-        query_text = thread[1]
-        result = thread[2]
-        sources = thread[3]  # JSONB
-        confidence_score = thread[4]
-        created_at = thread[5]
-        updated_at = thread[6]
-
-        # Create user message from query_text
-        conn.execute(
-            sa.text("""
-                INSERT INTO messages (thread_id, message_role, content, metadata, created_at, updated_at)
-                VALUES (:thread_id, 'user', :content, '{}', :created_at, :created_at)
-            """),
-            {
-                "thread_id": thread_id,
-                "content": query_text,
-                "created_at": created_at,
-            }
-        )
-
-        # Create assistant message from result (if exists)
-        if result:
-            # Build metadata for assistant message
-            metadata = {}
-            if sources and isinstance(sources, dict):
-                metadata["citations"] = sources.get("citations", [])
-            if confidence_score is not None:
-                metadata["confidence_score"] = float(confidence_score)
-
-            conn.execute(
-                sa.text("""
-                    INSERT INTO messages (thread_id, message_role, content, metadata, created_at, updated_at)
-                    VALUES (:thread_id, 'assistant', :content, CAST(:metadata AS jsonb), :updated_at, :updated_at)
-                """),
-                {
-                    "thread_id": thread_id,
-                    "content": result,
-                    "metadata": json.dumps(metadata),
-                    "updated_at": updated_at,
-                }
-            )
+    """Migrate existing threads to messages format.
+
+    The backfill runs as two set-based INSERT ... SELECT statements so that
+    row generation and metadata construction happen entirely inside Postgres
+    instead of round-tripping every thread through Python.
+
+    The foreign key and index on messages are dropped for the duration of
+    the backfill and rebuilt afterwards: one index build and one validation
+    scan is far cheaper than maintaining them for every inserted row.
+
+    messages is still empty at this point, so it is switched to UNLOGGED for
+    the load to skip per-row WAL and flipped back to LOGGED before the index
+    and FK are rebuilt.
+
+    Both INSERTs skip threads that already have a message of that role, so
+    rerunning the backfill after a partial failure does not duplicate rows.
+    """
+    # Drop FK and index before the bulk load (recreated below)
+    op.drop_index('idx_messages_created_at', table_name='messages')
+    op.drop_constraint('messages_thread_id_fkey', 'messages', type_='foreignkey')
+    op.execute("ALTER TABLE messages SET UNLOGGED")
+
+    # Create user message from query_text for every thread (no metadata)
+    op.execute("""
+        INSERT INTO messages (thread_id, message_role, content, metadata, created_at, updated_at)
+        SELECT t.id, 'user'::message_role, t.query_text, NULL, t.created_at, t.created_at
+        FROM threads t
+        WHERE t.query_text IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM messages m
+              WHERE m.thread_id = t.id AND m.message_role = 'user'
+          )
+    """)
+
+    # Create assistant message from result (if exists), migrating
+    # sources.citations and confidence_score into the message metadata
+    op.execute("""
+        INSERT INTO messages (thread_id, message_role, content, metadata, created_at, updated_at)
+        SELECT
+            t.id,
+            'assistant'::message_role,
+            t.result,
+            NULLIF(
+                CASE
+                    WHEN jsonb_typeof(t.sources) = 'object'
+                    THEN jsonb_build_object('citations', COALESCE(t.sources->'citations', '[]'::jsonb))
+                    ELSE '{}'::jsonb
+                END
+                || CASE
+                    WHEN t.confidence_score IS NOT NULL
+                    THEN jsonb_build_object('confidence_score', t.confidence_score::double precision)
+                    ELSE '{}'::jsonb
+                END,
+                '{}'::jsonb
+            ),
+            t.updated_at,
+            t.updated_at
+        FROM threads t
+        WHERE t.query_text IS NOT NULL
+          AND t.result IS NOT NULL
+          AND t.result <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM messages m
+              WHERE m.thread_id = t.id AND m.message_role = 'assistant'
+          )
+    """)
+
+    # Write the loaded table to WAL once, before rebuilding FK and index
+    op.execute("ALTER TABLE messages SET LOGGED")
+
+    # Recreate FK as NOT VALID, then validate all backfilled rows in one scan
+    op.execute("""
+        ALTER TABLE messages
+        ADD CONSTRAINT messages_thread_id_fkey
+        FOREIGN KEY (thread_id) REFERENCES threads(id) ON DELETE CASCADE
+        NOT VALID
+    """)
+    op.execute("ALTER TABLE messages VALIDATE CONSTRAINT messages_thread_id_fkey")
+
+    # Rebuild index over the loaded data
+    op.create_index('idx_messages_created_at', 'messages', ['thread_id', 'created_at'])
 
 
 def downgrade() -> None:
@@ -5,11 +5,17 @@ This module implements a stateful agent for processing natural language queries
 in conversation threads with document context retrieval and citation support.
 """
 
+import asyncio
+import functools
+import hashlib
+import heapq
 import logging
 import re
+import threading
+from collections import OrderedDict
 from typing import Any, TypedDict
 from uuid import UUID
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Sequence
 
 import tiktoken
 from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
@@ -43,6 +49,16 @@ MAX_CONTEXT_TOKENS = (
 )  # ~5100 tokens available for context
 
 
+# Citation markers in generated responses, e.g. "According to [1]"
+_CITATION_RE = re.compile(r"\[(\d+)\]")
+
+# Token counts keyed by (blake2b digest of text, model). Chunks retrieved on
+# one turn are usually retrieved again on follow-ups, so re-encoding is skipped.
+TOKEN_COUNT_CACHE_SIZE = 4096
+_token_count_cache: OrderedDict[tuple[bytes, str], int] = OrderedDict()
+_token_count_cache_lock = threading.Lock()
+
+
 # Enhanced system prompt for document Q&A specialist
 SYSTEM_PROMPT = """You are a specialized document intelligence assistant designed to answer questions based on provided document context. Your role is to:
 
@@ -87,11 +103,90 @@ Suggestions:
 - Upload additional documents that might contain the relevant information
 - Break down complex questions into simpler, more focused queries"""
 
+# Fixed parts of the user prompt, assembled once at import. Only the numbered
+# context and the question are spliced in per request.
+_CONTEXT_PROMPT_PREFIX = f"""{FEW_SHOT_EXAMPLES}
+
+Now, answer the following question based on the context provided:
+
+Context (with source numbers):
+"""
+
+_CONTEXT_PROMPT_SUFFIX = """
+
+Instructions:
+- Only use information from the context above
+- Cite sources using [N] notation
+- If information is insufficient, clearly state "I don't have enough information in the provided documents to answer this question accurately."
+- Be precise and concise
+
+Question: """
+
+_NO_CONTEXT_PROMPT_SUFFIX = f"""
+
+{NO_CONTEXT_FALLBACK_MESSAGE}"""
+
+
+# Encodings for the chat models this service uses; other models go through
+# tiktoken's registry lookup
+_MODEL_ENCODINGS = {
+    "gpt-4": "cl100k_base",
+    "gpt-4-turbo": "cl100k_base",
+    "gpt-3.5-turbo": "cl100k_base",
+    "gpt-4o": "o200k_base",
+    "gpt-4o-mini": "o200k_base",
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Get the tiktoken encoding for a model, cached per model name.
+
+    Args:
+        model: Model name for tokenizer
+
+    Returns:
+        Encoding for the model, or cl100k_base if the model is unknown to tiktoken
+    """
+    encoding_name = _MODEL_ENCODINGS.get(model)
+    if encoding_name is None:
+        try:
+            encoding_name = tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            encoding_name = "cl100k_base"
+    return tiktoken.get_encoding(encoding_name)
+
+
+def _token_cache_key(text: str, model: str) -> tuple[bytes, str]:
+    """Build a fixed-size token-count cache key for a text."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest(), model
+
+
+def _get_cached_token_count(key: tuple[bytes, str]) -> int | None:
+    """Look up a cached token count, marking it as recently used."""
+    with _token_count_cache_lock:
+        count = _token_count_cache.get(key)
+        if count is not None:
+            _token_count_cache.move_to_end(key)
+        return count
+
+
+def _set_cached_token_count(key: tuple[bytes, str], count: int) -> None:
+    """Store a token count, evicting the least recently used entry when full."""
+    with _token_count_cache_lock:
+        _token_count_cache[key] = count
+        _token_count_cache.move_to_end(key)
+        if len(_token_count_cache) > TOKEN_COUNT_CACHE_SIZE:
+            _token_count_cache.popitem(last=False)
+
 
 def count_tokens(text: str, model: str = "gpt-4") -> int:
     """
     Count tokens in a text string using tiktoken.
 
+    Counts are memoized by content hash, so repeated texts are encoded once.
+
     Args:
         text: Text to count tokens for
         model: Model name for tokenizer (default: gpt-4)
@@ -99,32 +194,97 @@ def count_tokens(text: str, model: str = "gpt-4") -> int:
     Returns:
         Number of tokens in the text
     """
+    key = _token_cache_key(text, model)
+    cached = _get_cached_token_count(key)
+    if cached is not None:
+        return cached
+
     try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
+        count = len(_get_encoding(model).encode(text))
     except Exception as e:
         logger.warning(f"Error counting tokens: {e}. Using character-based estimate.")
         # Fallback: rough estimate (4 chars per token)
         return len(text) // 4
 
+    _set_cached_token_count(key, count)
+    return count
+
+
+def _count_tokens_batch(texts: list[str], model: str = "gpt-4") -> list[int]:
+    """
+    Count tokens for several texts in one tiktoken call.
+
+    Cached counts are reused; only the remaining texts are encoded.
+
+    Args:
+        texts: Texts to count tokens for
+        model: Model name for tokenizer (default: gpt-4)
+
+    Returns:
+        Token count for each text, in input order
+    """
+    keys = [_token_cache_key(text, model) for text in texts]
+    cached = [_get_cached_token_count(key) for key in keys]
+    missing = [i for i, count in enumerate(cached) if count is None]
+
+    fresh_counts: list[int] = []
+    if missing:
+        try:
+            encoded = _get_encoding(model).encode_batch([texts[i] for i in missing], num_threads=4)
+            fresh_counts = [len(tokens) for tokens in encoded]
+            for i, count in zip(missing, fresh_counts, strict=True):
+                _set_cached_token_count(keys[i], count)
+        except Exception as e:
+            logger.warning(f"Error counting tokens: {e}. Using character-based estimate.")
+            fresh_counts = [len(texts[i]) // 4 for i in missing]
+
+    fresh = iter(fresh_counts)
+    return [count if count is not None else next(fresh) for count in cached]
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """
+    Truncate text to at most max_tokens tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Maximum number of tokens to keep
+        model: Model name for tokenizer (default: gpt-4)
+
+    Returns:
+        Leading portion of the text that fits within max_tokens
+    """
+    try:
+        encoding = _get_encoding(model)
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    except Exception as e:
+        logger.warning(f"Error truncating by tokens: {e}. Using character-based estimate.")
+        # Fallback: rough estimate (4 chars per token)
+        return text[: max_tokens * 4]
+
 
 def trim_context_to_budget(
     chunks: list[str],
     search_results: list[SearchResult] | None,
     max_tokens: int = MAX_CONTEXT_TOKENS,
+    token_counts: Sequence[int | None] | None = None,
 ) -> tuple[list[str], list[SearchResult] | None]:
     """
     Trim context chunks to fit within token budget.
 
     Uses adaptive strategy:
-    1. Calculate total tokens in all chunks
-    2. If over budget, keep highest-relevance chunks (by similarity score)
-    3. Trim from lowest-relevance upward until under budget
+    1. Count tokens for all chunks in a single batched pass
+    2. If the total fits the budget, return the inputs unchanged
+    3. Otherwise keep highest-relevance chunks (by similarity score),
+       reusing the counts from step 1 until the budget is exhausted
+    4. If not even the first chunk fits, keep it truncated to the budget
 
     Args:
         chunks: List of text chunks
         search_results: Corresponding search results with similarity scores
         max_tokens: Maximum tokens allowed for context
+        token_counts: Precomputed token count per chunk (optional); chunks
+            whose count is None are tokenized here
 
     Returns:
         Tuple of (trimmed_chunks, trimmed_search_results)
@@ -132,8 +292,14 @@ def trim_context_to_budget(
     if not chunks:
         return [], search_results
 
-    # Calculate total tokens
-    total_tokens = sum(count_tokens(chunk) for chunk in chunks)
+    # Tokenize every chunk at most once; counts are reused for selection below
+    if token_counts is None:
+        chunk_tokens_list = _count_tokens_batch(chunks)
+    else:
+        missing = [i for i, count in enumerate(token_counts) if count is None]
+        fresh = iter(_count_tokens_batch([chunks[i] for i in missing]) if missing else ())
+        chunk_tokens_list = [count if count is not None else next(fresh) for count in token_counts]
+    total_tokens = sum(chunk_tokens_list)
 
     if total_tokens <= max_tokens:
         logger.debug(f"Context within budget: {total_tokens}/{max_tokens} tokens")
@@ -144,24 +310,38 @@ def trim_context_to_budget(
         f"Trimming to highest-relevance chunks."
     )
 
-    # Sort chunks by relevance (highest first)
+    # A single oversized chunk needs no ranking; truncate it rather than
+    # dropping all context
+    if len(chunks) == 1:
+        return [_truncate_to_tokens(chunks[0], max_tokens)], search_results
+
+    # Take chunks by relevance (highest first)
     if search_results:
-        # Pair chunks with search results and sort by similarity score
-        paired = list(zip(chunks, search_results, strict=True))
-        paired.sort(key=lambda x: x[1].similarity_score, reverse=True)
+        # Heap of (-similarity, position): popping yields chunks in descending
+        # score order (ties in input order) without sorting the tail we never
+        # reach once the budget is exhausted
+        by_relevance = [(-result.similarity_score, i) for i, result in enumerate(search_results)]
+        heapq.heapify(by_relevance)
 
         # Take chunks until budget is reached
         selected_chunks = []
         selected_results = []
         current_tokens = 0
 
-        for chunk, result in paired:
-            chunk_tokens = count_tokens(chunk)
+        while by_relevance:
+            _, i = heapq.heappop(by_relevance)
+            chunk_tokens = chunk_tokens_list[i]
             if current_tokens + chunk_tokens <= max_tokens:
-                selected_chunks.append(chunk)
-                selected_results.append(result)
+                selected_chunks.append(chunks[i])
+                selected_results.append(search_results[i])
                 current_tokens += chunk_tokens
             else:
+                if not selected_chunks:
+                    # Even the most relevant chunk exceeds the budget; keep a
+                    # truncated copy rather than dropping all context
+                    selected_chunks.append(_truncate_to_tokens(chunks[i], max_tokens))
+                    selected_results.append(search_results[i])
+                    current_tokens = max_tokens
                 break
 
         logger.info(
@@ -175,12 +355,15 @@ def trim_context_to_budget(
     selected_chunks = []
     current_tokens = 0
 
-    for chunk in chunks:
-        chunk_tokens = count_tokens(chunk)
+    for chunk, chunk_tokens in zip(chunks, chunk_tokens_list, strict=True):
         if current_tokens + chunk_tokens <= max_tokens:
             selected_chunks.append(chunk)
             current_tokens += chunk_tokens
         else:
+            if not selected_chunks:
+                # First chunk alone exceeds the budget; keep a truncated copy
+                selected_chunks.append(_truncate_to_tokens(chunk, max_tokens))
+                current_tokens = max_tokens
             break
 
     logger.info(
@@ -261,8 +444,18 @@ async def retrieve_context(state: AgentState) -> AgentState:
         # Extract text for context
         context_chunks = [result.chunk.chunk_text for result in search_results]
 
-        # Apply token budget trimming
-        trimmed_chunks, trimmed_results = trim_context_to_budget(context_chunks, search_results)
+        # Apply token budget trimming, using the token counts stored at ingest.
+        # If any chunk still needs tiktoken, trim in a worker thread so the
+        # CPU-bound encoding does not block the event loop.
+        token_counts = [result.chunk.token_count for result in search_results]
+        if any(count is None for count in token_counts):
+            trimmed_chunks, trimmed_results = await asyncio.to_thread(
+                trim_context_to_budget, context_chunks, search_results, token_counts=token_counts
+            )
+        else:
+            trimmed_chunks, trimmed_results = trim_context_to_budget(
+                context_chunks, search_results, token_counts=token_counts
+            )
 
         state["context"] = trimmed_chunks
         state["search_results"] = trimmed_results
@@ -281,66 +474,88 @@ async def retrieve_context(state: AgentState) -> AgentState:
     return state
 
 
-async def generate_response(state: AgentState) -> AgentState:
-    """
-    Generate response from LLM based on context and query.
+# System message is immutable, so one instance is shared by every request
+_SYSTEM_MSG = SystemMessage(content=SYSTEM_PROMPT)
 
-    Non-streaming version for simple execution.
+
+# Chat message class for each stored conversation role. System messages from
+# history are skipped as the system prompt is always sent first.
+_HISTORY_MESSAGE_TYPES: dict[str, type[BaseMessage]] = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+}
+
+
+def _history_to_messages(conversation_history: list[dict[str, str]]) -> list[BaseMessage]:
+    """
+    Convert stored conversation turns to chat messages in a single pass.
 
     Args:
-        state: Current agent state
+        conversation_history: Prior turns as {"role", "content"} dicts
 
     Returns:
-        Updated state with generated response
+        Human/AI messages for the user and assistant turns, in order
     """
-    llm = get_llm(streaming=False)
+    return [
+        message_type(content=msg.get("content", ""))
+        for msg in conversation_history
+        if (message_type := _HISTORY_MESSAGE_TYPES.get(msg.get("role", ""))) is not None
+    ]
 
-    # Build prompt with context
-    if state["context"]:
-        # Number each context chunk for citations
-        numbered_contexts = [f"[{i+1}] {chunk}" for i, chunk in enumerate(state["context"])]
-        context_text = "\n\n".join(numbered_contexts)
 
-        prompt = f"""{FEW_SHOT_EXAMPLES}
+def _build_messages(state: AgentState) -> list[BaseMessage]:
+    """
+    Build the LLM message list for the current query.
 
-Now, answer the following question based on the context provided:
+    The system prompt comes first, then prior conversation turns, then the
+    current question with its numbered context (or the no-context fallback).
 
-Context (with source numbers):
-{context_text}
+    Args:
+        state: Current agent state
 
-Question: {state["query"]}
+    Returns:
+        Messages ready to send to the chat model
+    """
+    # Build prompt with context. Stable text (examples, instructions) comes
+    # before the volatile question so provider-side prefix caching can reuse it.
+    if state["context"]:
+        # Number each context chunk for citations
+        context_text = "\n\n".join(f"[{i + 1}] {chunk}" for i, chunk in enumerate(state["context"]))
 
-Instructions:
-- Only use information from the context above
-- Cite sources using [N] notation
-- If information is insufficient, clearly state "I don't have enough information in the provided documents to answer this question accurately."
-- Be precise and concise"""
+        prompt = "".join(
+            (_CONTEXT_PROMPT_PREFIX, context_text, _CONTEXT_PROMPT_SUFFIX, state["query"])
+        )
     else:
         # No context available - use consistent fallback message
-        prompt = f"""Question: {state["query"]}
-
-{NO_CONTEXT_FALLBACK_MESSAGE}"""
+        prompt = "".join(("Question: ", state["query"], _NO_CONTEXT_PROMPT_SUFFIX))
 
     # Build messages array with conversation history for multi-turn support
-    messages: list[BaseMessage] = [SystemMessage(content=SYSTEM_PROMPT)]
+    messages: list[BaseMessage] = [_SYSTEM_MSG]
 
     # Add conversation history if present (for multi-turn conversations)
-    conversation_history = state.get("conversation_history", [])
-    if conversation_history:
-        for msg in conversation_history:
-            role = msg.get("role")
-            msg_content = msg.get("content", "")
-
-            if role == "user":
-                messages.append(HumanMessage(content=msg_content))
-            elif role == "assistant":
-                messages.append(AIMessage(content=msg_content))
-            # Skip system messages from history as we already have the system prompt
+    messages.extend(_history_to_messages(state.get("conversation_history") or []))
 
     # Add current query
     messages.append(HumanMessage(content=prompt))
 
-    response = await llm.ainvoke(messages)
+    return messages
+
+
+async def generate_response(state: AgentState) -> AgentState:
+    """
+    Generate response from LLM based on context and query.
+
+    Non-streaming version for simple execution.
+
+    Args:
+        state: Current agent state
+
+    Returns:
+        Updated state with generated response
+    """
+    llm = get_llm(streaming=False)
+
+    response = await llm.ainvoke(_build_messages(state))
     # response.content can be str or list, we only want str
     content = response.content if isinstance(response.content, str) else str(response.content)
     state["response"] = content
@@ -362,56 +577,26 @@ async def generate_response_streaming(state: AgentState) -> AsyncGenerator[str,
     """
     llm = get_llm(streaming=True)
 
-    # Build prompt with context
-    if state["context"]:
-        # Number each context chunk for citations
-        numbered_contexts = [f"[{i+1}] {chunk}" for i, chunk in enumerate(state["context"])]
-        context_text = "\n\n".join(numbered_contexts)
-
-        prompt = f"""{FEW_SHOT_EXAMPLES}
-
-Now, answer the following question based on the context provided:
-
-Context (with source numbers):
-{context_text}
-
-Question: {state["query"]}
-
-Instructions:
-- Only use information from the context above
-- Cite sources using [N] notation
-- If information is insufficient, clearly state "I don't have enough information in the provided documents to answer this question accurately."
-- Be precise and concise"""
-    else:
-        # No context available - use consistent fallback message
-        prompt = f"""Question: {state["query"]}
-
-{NO_CONTEXT_FALLBACK_MESSAGE}"""
+    stream = llm.astream(_build_messages(state))
 
-    # Build messages array with conversation history for multi-turn support
-    messages: list[BaseMessage] = [SystemMessage(content=SYSTEM_PROMPT)]
+    # chunk.content can be str or list, we only want str. A provider returns
+    # one shape for the whole stream, so check the first non-empty chunk and
+    # then run a loop without a per-token type check.
+    async for chunk in stream:
+        if not chunk.content:
+            continue
 
-    # Add conversation history if present (for multi-turn conversations)
-    conversation_history = state.get("conversation_history", [])
-    if conversation_history:
-        for msg in conversation_history:
-            role = msg.get("role")
-            content = msg.get("content", "")
-
-            if role == "user":
-                messages.append(HumanMessage(content=content))
-            elif role == "assistant":
-                messages.append(AIMessage(content=content))
-            # Skip system messages from history as we already have the system prompt
-
-    # Add current query
-    messages.append(HumanMessage(content=prompt))
-
-    async for chunk in llm.astream(messages):
-        if chunk.content:
-            # chunk.content can be str or list, we only want str
-            content = chunk.content if isinstance(chunk.content, str) else str(chunk.content)
-            yield content
+        if isinstance(chunk.content, str):
+            yield chunk.content
+            async for rest in stream:
+                if rest.content:
+                    yield rest.content
+        else:
+            yield str(chunk.content)
+            async for rest in stream:
+                if rest.content:
+                    yield str(rest.content)
+        return
 
 
 def extract_citations(
@@ -433,41 +618,43 @@ def extract_citations(
     Returns:
         List of citation dictionaries with document metadata
     """
-    citations = []
-
     # Simple pattern matching for common citation formats
     # e.g., "According to [1]", "As stated in [2]", etc.
-    citation_pattern = r"\[(\d+)\]"
-    matches = re.findall(citation_pattern, response)
-
-    for match in matches:
-        citation_num = int(match)
-        if 0 < citation_num <= len(context):
-            citation_data = {
-                "index": citation_num,
-                "text": context[citation_num - 1],
-            }
-
-            # Add rich metadata if search results available
-            if search_results and citation_num <= len(search_results):
-                result = search_results[citation_num - 1]
-                chunk = result.chunk
-                document = result.document
-
-                citation_data.update(
-                    {
-                        "document_id": str(chunk.document_id),
-                        "document_title": document.name,
-                        "chunk_index": chunk.chunk_index,
-                        "similarity_score": round(result.similarity_score, 4),
-                        # Extract metadata from chunk
-                        "page_number": chunk.chunk_metadata.get("page_num"),
-                        "start_char": chunk.start_char,
-                        "end_char": chunk.end_char,
-                    }
-                )
-
-            citations.append(citation_data)
+    # Repeated markers (including "[01]" vs "[1]") are collapsed to one
+    # citation each, keeping first-appearance order
+    citation_nums = dict.fromkeys(int(match[1]) for match in _CITATION_RE.finditer(response))
+
+    # Valid source numbers are 1..len(context); the first num_enriched of
+    # them also have search results to pull document metadata from
+    enriched_results = search_results or []
+    num_context = len(context)
+    num_enriched = min(num_context, len(enriched_results))
+
+    citations = []
+    for citation_num in citation_nums:
+        if not 0 < citation_num <= num_context:
+            continue
+
+        # Add rich metadata if search results available
+        if citation_num <= num_enriched:
+            result = enriched_results[citation_num - 1]
+            chunk = result.chunk
+            citations.append(
+                {
+                    "index": citation_num,
+                    "text": context[citation_num - 1],
+                    "document_id": str(chunk.document_id),
+                    "document_title": result.document.name,
+                    "chunk_index": chunk.chunk_index,
+                    "similarity_score": round(result.similarity_score, 4),
+                    # Extract metadata from chunk
+                    "page_number": chunk.chunk_metadata.get("page_num"),
+                    "start_char": chunk.start_char,
+                    "end_char": chunk.end_char,
+                }
+            )
+        else:
+            citations.append({"index": citation_num, "text": context[citation_num - 1]})
 
     return citations
 
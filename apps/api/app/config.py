@@ -22,6 +22,30 @@ class Settings(BaseSettings):
 
     # Database Configuration - Supabase only
     database_url: str = Field(default="", description="Supabase database connection URL")
+    # Pool limits are per worker process: workers x (db_pool_size + db_max_overflow)
+    # must stay below the Supabase pooler's client connection limit
+    db_pool_size: int = Field(
+        default=10, description="Persistent connections kept in each worker's pool"
+    )
+    db_max_overflow: int = Field(
+        default=20,
+        description="Extra connections each worker may open beyond db_pool_size under load",
+    )
+    db_pool_recycle: int = Field(
+        default=1800, description="Seconds before a pooled connection is recycled"
+    )
+    db_pool_use_lifo: bool = Field(
+        default=True,
+        description="Reuse the most recently returned connection first (keeps hot connections hot)",
+    )
+    db_pool_warmup: bool = Field(default=True, description="Open pooled connections at startup")
+    db_pool_warmup_connections: int = Field(
+        default=2,
+        description="Connections each worker opens at startup (capped at db_pool_size)",
+    )
+    db_query_cache_size: int = Field(
+        default=1200, description="Compiled SQL statements kept in the engine's cache"
+    )
 
     # Supabase Configuration
     supabase_url: str = Field(default="", description="Supabase project URL")
@@ -1,5 +1,5 @@
 """Database package for session management."""
 
-from .session import get_session, get_session_factory
+from .session import get_session, get_session_factory, session_scope
 
-__all__ = ["get_session", "get_session_factory"]
+__all__ = ["get_session", "get_session_factory", "session_scope"]
@@ -0,0 +1,24 @@
+"""Helpers for inspecting PostgreSQL errors raised through SQLAlchemy."""
+
+from sqlalchemy.exc import DBAPIError
+
+# PostgreSQL SQLSTATE codes (https://www.postgresql.org/docs/current/errcodes-appendix.html)
+NOT_NULL_VIOLATION = "23502"
+FOREIGN_KEY_VIOLATION = "23503"
+UNIQUE_VIOLATION = "23505"
+
+
+def pg_error_code(error: DBAPIError) -> str | None:
+    """Return the SQLSTATE code of a database error, if the driver reported one."""
+    return getattr(error.orig, "sqlstate", None)
+
+
+def pg_constraint_name(error: DBAPIError) -> str | None:
+    """
+    Return the name of the constraint a database error violated, if any.
+
+    asyncpg reports it on its own exception, which SQLAlchemy's DBAPI adapter
+    chains as the cause of ``error.orig``.
+    """
+    driver_error = getattr(error.orig, "__cause__", None)
+    return getattr(driver_error, "constraint_name", None)
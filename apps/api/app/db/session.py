@@ -1,7 +1,10 @@
 """Database session management."""
 
-from collections.abc import AsyncGenerator
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -30,9 +33,11 @@ def get_engine() -> AsyncEngine:
             database_url,
             echo=settings.debug,
             pool_pre_ping=True,
-            pool_recycle=3600,
-            pool_size=10,
-            max_overflow=20,
+            pool_recycle=settings.db_pool_recycle,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_use_lifo=settings.db_pool_use_lifo,
+            query_cache_size=settings.db_query_cache_size,
         )
     return _engine
 
@@ -48,9 +53,12 @@ def get_session_factory() -> async_sessionmaker[AsyncSession]:
     return _async_session_factory
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
     """
-    Dependency function to get database session.
+    Open a database session for the duration of an ``async with`` block.
+
+    Rolls back if the block raises and always closes the session on exit.
 
     Yields:
         AsyncSession: Database session
@@ -66,6 +74,36 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get database session.
+
+    Yields:
+        AsyncSession: Database session
+    """
+    async with session_scope() as session:
+        yield session
+
+
+async def warm_up_pool(connections: int) -> None:
+    """
+    Open pooled connections up front so early requests skip connect, TLS and auth.
+
+    The checkouts run concurrently, so each one establishes its own connection
+    before they are all returned to the pool.
+
+    Args:
+        connections: Number of connections to establish (at most the pool size)
+    """
+    engine = get_engine()
+
+    async def _ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(_ping() for _ in range(connections)))
+
+
 async def close_db() -> None:
     """Close database engine if it was created."""
     global _engine
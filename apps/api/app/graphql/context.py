@@ -0,0 +1,25 @@
+"""GraphQL request context."""
+
+from typing import Any
+
+from fastapi import Request
+
+from .loaders import create_loaders
+
+
+async def get_context(request: Request) -> dict[str, Any]:
+    """
+    Build the context passed to every resolver of a GraphQL request.
+
+    Args:
+        request: Incoming HTTP request (carries the authenticated user on request.state)
+
+    Returns:
+        Context dict with the request, the authenticated user (or None) and
+        request-scoped DataLoaders
+    """
+    return {
+        "request": request,
+        "user": getattr(request.state, "user", None),
+        **create_loaders(),
+    }
@@ -0,0 +1,9 @@
+"""Typed errors raised by GraphQL resolvers."""
+
+
+class AuthorizationError(Exception):
+    """The authenticated user is not allowed to perform the requested operation."""
+
+
+class InvalidInputError(ValueError):
+    """A resolver argument is malformed (for example, an ID that is not a UUID)."""
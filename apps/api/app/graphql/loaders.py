@@ -0,0 +1,41 @@
+"""Request-scoped DataLoaders for batching GraphQL lookups."""
+
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select
+from strawberry.dataloader import DataLoader
+
+from app.db.session import get_session_factory
+from app.models.user import User as UserModel
+
+
+async def load_users(keys: list[UUID]) -> list[UserModel | None]:
+    """
+    Load many users by ID in one query.
+
+    Args:
+        keys: User IDs collected by the DataLoader
+
+    Returns:
+        The User row for each key (None if it does not exist), aligned to keys
+    """
+    session_factory = get_session_factory()
+    async with session_factory() as session:
+        stmt = select(UserModel).where(UserModel.id.in_(keys))
+        result = await session.execute(stmt)
+        users = {user.id: user for user in result.scalars()}
+
+    return [users.get(key) for key in keys]
+
+
+def create_loaders() -> dict[str, DataLoader[Any, Any]]:
+    """
+    Create a fresh set of DataLoaders for a single GraphQL request.
+
+    Loaders cache results for their lifetime, so they must never be shared
+    between requests.
+    """
+    return {
+        "user_loader": DataLoader(load_fn=load_users),
+    }
@@ -1,13 +1,24 @@
 """GraphQL mutation resolvers."""
 
+import asyncio
 import logging
-from uuid import UUID
+from typing import Any
+from uuid import UUID, uuid4
 
 import strawberry
-from sqlalchemy import select
+from sqlalchemy import Select, and_, bindparam, delete, exists, lambda_stmt, select, update
+from sqlalchemy.dialects.postgresql import Insert, insert as pg_insert
 from sqlalchemy.exc import IntegrityError
-
-from app.db.session import get_session
+from sqlalchemy.orm import Load, selectinload
+
+from app.db.errors import (
+    FOREIGN_KEY_VIOLATION,
+    NOT_NULL_VIOLATION,
+    UNIQUE_VIOLATION,
+    pg_constraint_name,
+    pg_error_code,
+)
+from app.db.session import session_scope
 from app.models.organization import Organization as OrganizationModel
 from app.models.organization_member import (
     OrganizationMember as OrganizationMemberModel,
@@ -16,8 +27,10 @@ from app.models.organization_member import (
 from app.models.space import MemberRole, Space as SpaceModel, SpaceMember as SpaceMemberModel
 from app.models.thread import Thread as ThreadModel
 from app.models.user import User as UserModel
-from app.utils.slug import generate_unique_slug
+from app.utils.slug import slugify, suffixed_slug
 
+from .errors import AuthorizationError, InvalidInputError
+from .permissions import IsAuthenticated
 from .types import (
     AddOrganizationMemberInput,
     CreateOrganizationInput,
@@ -38,6 +51,185 @@ from .types import (
 
 logger = logging.getLogger(__name__)
 
+# How many times a name-derived slug that collided is retried with a random suffix
+_SLUG_RETRIES = 2
+
+# Unique constraints that reject a duplicate organization slug: the column's UNIQUE
+# constraint and idx_organizations_slug from the migration, ix_* from the model metadata
+_ORG_SLUG_CONSTRAINTS = frozenset(
+    {"organizations_slug_key", "idx_organizations_slug", "ix_organizations_slug"}
+)
+
+# GraphQL role enum -> database role enum, built once instead of per mutation
+_GQL_TO_DB_ROLE = {role: OrganizationRole(role.value) for role in OrganizationRoleType}
+
+
+def _parse_uuid(value: str) -> UUID | None:
+    """Parse a GraphQL ID into a UUID, returning None if it is not a valid UUID."""
+    try:
+        return UUID(value)
+    except ValueError:
+        return None
+
+
+def _provided_fields(input: object, *names: str) -> dict[str, Any]:
+    """Collect the named input fields that were provided (i.e. are not None)."""
+    return {name: value for name in names if (value := getattr(input, name)) is not None}
+
+
+def _insert_space_stmt(values: dict[str, Any]) -> Insert:
+    """Build an INSERT for a space that yields its id, or no row if the slug is taken."""
+    return (
+        pg_insert(SpaceModel)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[SpaceModel.slug])
+        .returning(SpaceModel.id)
+    )
+
+
+def _thread_integrity_error_message(error: IntegrityError) -> str:
+    """Map a thread write's IntegrityError to a user-facing message without schema details."""
+    code = pg_error_code(error)
+    constraint = pg_constraint_name(error) or ""
+
+    if code == FOREIGN_KEY_VIOLATION:
+        if constraint.startswith("fk_threads_organization_id"):
+            return "Invalid organization specified"
+        if constraint.startswith(("fk_threads_space_id", "fk_spaces_")):
+            return "Invalid space specified"
+    elif code == NOT_NULL_VIOLATION:
+        return "Required field missing"
+    elif code == UNIQUE_VIOLATION:
+        return "Duplicate entry already exists"
+
+    # Generic message for unknown integrity errors
+    return "Invalid data provided"
+
+
+# Authorization lookups run on every space/thread mutation. lambda_stmt caches the
+# constructed statement by the lambda's code location, so per-request work is just
+# binding parameters.
+_SPACE_WITH_MEMBERSHIP_STMT = lambda_stmt(
+    lambda: (
+        select(SpaceModel, SpaceMemberModel)
+        .outerjoin(
+            SpaceMemberModel,
+            and_(
+                SpaceMemberModel.space_id == SpaceModel.id,
+                SpaceMemberModel.user_id == bindparam("user_id"),
+            ),
+        )
+        .where(SpaceModel.id == bindparam("space_id"))
+    )
+)
+
+# Roles allowed to manage an organization. Shared by the admin checks below, where
+# lambda_stmt turns it into one expanding bound parameter.
+_ORG_ADMIN_ROLES = (OrganizationRole.ADMIN, OrganizationRole.OWNER)
+
+
+def _thread_access_select(*columns: Any) -> Select[Any]:
+    """
+    Select the given columns for one thread, joined to its space, plus the caller's org
+    admin flag as a correlated EXISTS column.
+
+    Binds thread_id and user_id.
+    """
+    is_org_admin = (
+        exists()
+        .where(
+            (OrganizationMemberModel.organization_id == ThreadModel.organization_id)
+            & (OrganizationMemberModel.user_id == bindparam("user_id"))
+            & OrganizationMemberModel.organization_role.in_(_ORG_ADMIN_ROLES)
+        )
+        .label("is_org_admin")
+    )
+    return (
+        select(*columns, is_org_admin)
+        .outerjoin(SpaceModel, SpaceModel.id == ThreadModel.space_id)
+        .where(ThreadModel.id == bindparam("thread_id"))
+    )
+
+
+# Thread mutations authorize against the thread's space and, for org-wide threads, the
+# caller's org admin role, all in one query. update_thread needs the thread row itself
+# (and its messages) to apply and return the changes; it never checks membership.
+_THREAD_WITH_ACCESS_STMT = lambda_stmt(
+    lambda: _thread_access_select(ThreadModel, SpaceModel).options(
+        # Only the space's owner_id is checked; skip its selectin collections
+        Load(SpaceModel).lazyload("*"),
+        # Thread.from_model reads messages; load them up front since there is no
+        # refresh after the commit and lazy loads cannot run under asyncio
+        selectinload(ThreadModel.messages),
+    )
+)
+
+# delete_thread only needs the ids behind the checks plus the caller's space
+# membership, so skip hydrating the thread (whose query_text/result can be large)
+# and the space
+_THREAD_ACCESS_FLAGS_STMT = lambda_stmt(
+    lambda: _thread_access_select(
+        ThreadModel.created_by,
+        ThreadModel.space_id,
+        SpaceModel.owner_id.label("space_owner_id"),
+        SpaceMemberModel.id.is_not(None).label("is_member"),
+    ).outerjoin(
+        SpaceMemberModel,
+        and_(
+            SpaceMemberModel.space_id == SpaceModel.id,
+            SpaceMemberModel.user_id == bindparam("user_id"),
+        ),
+    )
+)
+
+# Organization mutations need the row itself plus the admin flag; fetch both in one
+# round-trip with the flag as a correlated EXISTS column.
+_ORG_WITH_ADMIN_FLAG_STMT = lambda_stmt(
+    lambda: select(
+        OrganizationModel,
+        exists()
+        .where(
+            (OrganizationMemberModel.organization_id == OrganizationModel.id)
+            & (OrganizationMemberModel.user_id == bindparam("user_id"))
+            & OrganizationMemberModel.organization_role.in_(_ORG_ADMIN_ROLES)
+        )
+        .label("is_admin"),
+    ).where(OrganizationModel.id == bindparam("organization_id"))
+)
+
+# Member management only checks owner_id and the admin flag; skip the organization's
+# selectin collections (members, spaces, threads), which would cost three more queries.
+_ORG_ADMIN_CHECK_STMT = _ORG_WITH_ADMIN_FLAG_STMT + (
+    lambda stmt: stmt.options(Load(OrganizationModel).lazyload("*"))
+)
+
+_ORG_MEMBER_STMT = lambda_stmt(
+    lambda: select(OrganizationMemberModel).where(
+        (OrganizationMemberModel.organization_id == bindparam("organization_id"))
+        & (OrganizationMemberModel.user_id == bindparam("user_id"))
+    )
+)
+
+# The space a concurrent retry of the same create_space request inserted: same slug,
+# owner, organization and name (spaces.slug is unique across organizations)
+_SAME_SPACE_REQUEST_STMT = lambda_stmt(
+    lambda: select(SpaceModel).where(
+        (SpaceModel.slug == bindparam("slug"))
+        & (SpaceModel.owner_id == bindparam("owner_id"))
+        & (SpaceModel.organization_id == bindparam("organization_id"))
+        & (SpaceModel.name == bindparam("name"))
+    )
+)
+
+# Messages and thread_documents go with the thread via ON DELETE CASCADE
+_DELETE_THREAD_STMT = lambda_stmt(
+    lambda: (
+        delete(ThreadModel)
+        .where(ThreadModel.id == bindparam("thread_id"))
+        .returning(ThreadModel.id)
+    )
+)
+
 
 @strawberry.type
 class Mutation:
@@ -46,85 +238,73 @@ class Mutation:
     @strawberry.mutation
     async def create_user(self, input: CreateUserInput) -> User:
         """Create a new user."""
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Create new user instance
-                user_model = UserModel(
-                    email=input.email,
-                    full_name=input.full_name,
-                    avatar_url=input.avatar_url,
-                    bio=input.bio,
-                )
-
-                session.add(user_model)
-                await session.commit()
-                await session.refresh(user_model)
-
-                return User.from_model(user_model)
-
-            except IntegrityError:
-                await session.rollback()
-                raise ValueError(f"User with email {input.email} already exists")
+                # Commits on exit; rolls back if the INSERT fails
+                async with session.begin():
+                    user_model = UserModel(
+                        email=input.email,
+                        full_name=input.full_name,
+                        avatar_url=input.avatar_url,
+                        bio=input.bio,
+                    )
+                    session.add(user_model)
+            except IntegrityError as e:
+                msg = f"User with email {input.email} already exists"
+                raise ValueError(msg) from e
 
-        # Fallback if session doesn't yield for my MyPy
-        msg = "Database session unavailable"
-        raise RuntimeError(msg)
+            return User.from_model(user_model)
 
     @strawberry.mutation
     async def update_user(self, id: strawberry.ID, input: UpdateUserInput) -> User | None:
         """Update an existing user."""
-        async for session in get_session():
-            try:
-                user_id = UUID(str(id))
-                stmt = select(UserModel).where(UserModel.id == user_id)
-                result = await session.execute(stmt)
-                user_model = result.scalar_one_or_none()
-
-                if not user_model:
-                    return None
-
-                # Update fields if provided
-                if input.full_name is not None:
-                    user_model.full_name = input.full_name
-                if input.avatar_url is not None:
-                    user_model.avatar_url = input.avatar_url
-                if input.bio is not None:
-                    user_model.bio = input.bio
-
-                await session.commit()
-                await session.refresh(user_model)
+        user_id = _parse_uuid(id)
+        if user_id is None:
+            return None
+
+        updates = _provided_fields(input, "full_name", "avatar_url", "bio")
+
+        async with session_scope() as session:
+            if not updates:
+                # Nothing to change: skip the UPDATE and COMMIT and leave updated_at alone
+                user_model = await session.get(UserModel, user_id)
+                return User.from_model(user_model) if user_model else None
+
+            # Single UPDATE ... RETURNING round-trip instead of SELECT + ORM flush
+            stmt = (
+                update(UserModel)
+                .where(UserModel.id == user_id)
+                .values(**updates)
+                .returning(UserModel)
+            )
+            user_model = (await session.execute(stmt)).scalar_one_or_none()
+
+            if not user_model:
+                return None
 
-                return User.from_model(user_model)
+            await session.commit()
 
-            except ValueError:
-                # Invalid UUID format
-                return None
-        return None
+            return User.from_model(user_model)
 
     @strawberry.mutation
     async def delete_user(self, id: strawberry.ID) -> bool:
         """Delete a user by ID."""
-        async for session in get_session():
-            try:
-                user_id = UUID(str(id))
-                stmt = select(UserModel).where(UserModel.id == user_id)
-                result = await session.execute(stmt)
-                user_model = result.scalar_one_or_none()
+        user_id = _parse_uuid(id)
+        if user_id is None:
+            return False
 
-                if not user_model:
-                    return False
+        async with session_scope() as session:
+            user_model = await session.get(UserModel, user_id)
 
-                await session.delete(user_model)
-                await session.commit()
+            if not user_model:
+                return False
 
-                return True
+            await session.delete(user_model)
+            await session.commit()
 
-            except ValueError:
-                # Invalid UUID format
-                return False
-        return False
+            return True
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def create_organization(
         self, info: strawberry.types.Info, input: CreateOrganizationInput
     ) -> Organization:
@@ -141,66 +321,59 @@ class Mutation:
             - Any authenticated user can create an organization
             - Creator automatically becomes the owner
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required to create an organization"
-                    raise ValueError(msg)
-
-                user_id = user.id
-
-                # Generate unique slug from organization name if not provided
-                slug = input.slug
-                if not slug:
-                    slug = await generate_unique_slug(input.name, session, OrganizationModel)
-
-                # Create new organization instance
-                org_model = OrganizationModel(
-                    name=input.name,
-                    slug=slug,
-                    description=input.description,
-                    owner_id=user_id,
-                )
-
-                session.add(org_model)
-                await session.flush()  # Flush to get the organization ID
-
-                # Add creator as owner in organization_members
-                org_member = OrganizationMemberModel(
-                    organization_id=org_model.id,
-                    user_id=user_id,
-                    organization_role=OrganizationRole.OWNER,
-                )
-
-                session.add(org_member)
-                await session.commit()
-
-                # Refresh the model (relationships eager loaded via lazy='selectin')
-                await session.refresh(org_model)
-
-                return Organization.from_model(org_model)
-
-            except IntegrityError as e:
-                await session.rollback()
+        # Authenticated user (guaranteed by IsAuthenticated)
+        user_id = info.context["user"].id
+
+        # Pick the slug optimistically: insert the plain slug and, if one derived
+        # from the name is already taken, retry with a random suffix. Collisions
+        # are rare, so this avoids probing the table before every insert.
+        base_slug = input.slug or slugify(input.name) or uuid4().hex[:8]
+        slug = base_slug
+        retries_left = 0 if input.slug else _SLUG_RETRIES
+
+        async with session_scope() as session:
+            while True:
+                try:
+                    # Commits on exit; rolls back (discarding the pending rows) on error
+                    async with session.begin():
+                        # Create the organization with the creator as owner in
+                        # organization_members. Building the collections in memory
+                        # means from_model can count them without a refresh.
+                        org_model = OrganizationModel(
+                            name=input.name,
+                            slug=slug,
+                            description=input.description,
+                            owner_id=user_id,
+                            members=[
+                                OrganizationMemberModel(
+                                    user_id=user_id, organization_role=OrganizationRole.OWNER
+                                )
+                            ],
+                            spaces=[],
+                            threads=[],
+                        )
+                        session.add(org_model)
+                    break
+                except IntegrityError as e:
+                    slug_taken = (
+                        pg_error_code(e) == UNIQUE_VIOLATION
+                        and pg_constraint_name(e) in _ORG_SLUG_CONSTRAINTS
+                    )
+                    if slug_taken and retries_left > 0:
+                        retries_left -= 1
+                        slug = suffixed_slug(base_slug)
+                        continue
 
-                # Handle slug uniqueness violation
-                if "unique_constraint" in str(e).lower() or "slug" in str(e).lower():
-                    msg = "Organization with this slug already exists"
-                    raise ValueError(msg)
+                    if slug_taken:
+                        msg = "Organization with this slug already exists"
+                        raise ValueError(msg) from e
 
-                # For other integrity errors, raise generic error
-                msg = "Failed to create organization due to database constraint"
-                raise ValueError(msg)
+                    msg = "Failed to create organization due to database constraint"
+                    raise ValueError(msg) from e
 
-        # Fallback if session doesn't yield for MyPy
-        msg = "Database session unavailable"
-        raise RuntimeError(msg)
+            return Organization.from_model(org_model)
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def update_organization(
         self, info: strawberry.types.Info, id: strawberry.ID, input: UpdateOrganizationInput
     ) -> Organization | None:
@@ -217,66 +390,51 @@ class Mutation:
         Authorization:
             - Only owner or admins can update
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
-                user_id = user.id
-                org_id = UUID(str(id))
+        async with session_scope() as session:
+            # Authenticated user (guaranteed by IsAuthenticated)
+            user = info.context["user"]
+            user_id = user.id
+            org_id = _parse_uuid(id)
+            if org_id is None:
+                msg = "Invalid organization ID"
+                raise InvalidInputError(msg)
+
+            # Get organization together with the caller's admin flag
+            result = await session.execute(
+                _ORG_WITH_ADMIN_FLAG_STMT, {"organization_id": org_id, "user_id": user_id}
+            )
+            row = result.first()
+
+            if row is None:
+                msg = "Organization not found"
+                raise ValueError(msg)
 
-                # Get organization
-                stmt = select(OrganizationModel).where(OrganizationModel.id == org_id)
-                result = await session.execute(stmt)
-                org_model = result.scalar_one_or_none()
+            org_model, is_admin = row
 
-                if not org_model:
-                    msg = "Organization not found"
-                    raise ValueError(msg)
+            # Check authorization: owner or admin
+            is_owner = org_model.owner_id == user_id
 
-                # Check authorization: owner or admin
-                is_owner = org_model.owner_id == user_id
+            if not is_owner and not is_admin:
+                msg = "Insufficient permissions to update this organization"
+                raise AuthorizationError(msg)
 
-                # Check if user is an admin member
-                member_stmt = select(OrganizationMemberModel).where(
-                    (OrganizationMemberModel.organization_id == org_id)
-                    & (OrganizationMemberModel.user_id == user_id)
-                    & (
-                        OrganizationMemberModel.organization_role.in_(
-                            [OrganizationRole.ADMIN, OrganizationRole.OWNER]
-                        )
-                    )
+            # Update fields if provided (no COMMIT for a no-op update). UPDATE ... RETURNING
+            # refreshes the already-loaded org_model in place, updated_at included.
+            updates = _provided_fields(input, "name", "description")
+            if updates:
+                stmt = (
+                    update(OrganizationModel)
+                    .where(OrganizationModel.id == org_id)
+                    .values(**updates)
+                    .returning(OrganizationModel)
                 )
-                member_result = await session.execute(member_stmt)
-                is_admin = member_result.scalar_one_or_none() is not None
-
-                if not is_owner and not is_admin:
-                    msg = "Insufficient permissions to update this organization"
-                    raise ValueError(msg)
-
-                # Update fields if provided
-                if input.name is not None:
-                    org_model.name = input.name
-                if input.description is not None:
-                    org_model.description = input.description
+                org_model = (await session.execute(stmt)).scalar_one()
 
                 await session.commit()
-                await session.refresh(org_model)
-
-                return Organization.from_model(org_model)
 
-            except ValueError:
-                await session.rollback()
-                raise
-
-        return None
+            return Organization.from_model(org_model)
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def delete_organization(self, info: strawberry.types.Info, id: strawberry.ID) -> bool:
         """
         Delete an organization by ID.
@@ -290,45 +448,33 @@ class Mutation:
         Authorization:
             - Only the owner can delete an organization
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
-                user_id = user.id
-                org_id = UUID(str(id))
-
-                # Get organization
-                stmt = select(OrganizationModel).where(OrganizationModel.id == org_id)
-                result = await session.execute(stmt)
-                org_model = result.scalar_one_or_none()
-
-                if not org_model:
-                    msg = "Organization not found"
-                    raise ValueError(msg)
-
-                # Check authorization: only owner can delete
-                if org_model.owner_id != user_id:
-                    msg = "Only the owner can delete this organization"
-                    raise ValueError(msg)
-
-                await session.delete(org_model)
-                await session.commit()
+        async with session_scope() as session:
+            # Authenticated user (guaranteed by IsAuthenticated)
+            user = info.context["user"]
+            user_id = user.id
+            org_id = _parse_uuid(id)
+            if org_id is None:
+                msg = "Invalid organization ID"
+                raise InvalidInputError(msg)
+
+            # Get organization
+            org_model = await session.get(OrganizationModel, org_id)
+
+            if not org_model:
+                msg = "Organization not found"
+                raise ValueError(msg)
 
-                return True
+            # Check authorization: only owner can delete
+            if org_model.owner_id != user_id:
+                msg = "Only the owner can delete this organization"
+                raise AuthorizationError(msg)
 
-            except ValueError:
-                await session.rollback()
-                raise
+            await session.delete(org_model)
+            await session.commit()
 
-        return False
+            return True
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def add_organization_member(
         self, info: strawberry.types.Info, input: AddOrganizationMemberInput
     ) -> OrganizationMember:
@@ -344,86 +490,70 @@ class Mutation:
         Authorization:
             - Only owner or admins can add members
         """
-        async for session in get_session():
+        # Authenticated user (guaranteed by IsAuthenticated)
+        current_user_id = info.context["user"].id
+        org_id = _parse_uuid(input.organization_id)
+        target_user_id = _parse_uuid(input.user_id)
+        if org_id is None or target_user_id is None:
+            msg = "Invalid organization or user ID"
+            raise InvalidInputError(msg)
+
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
-                current_user_id = user.id
-                org_id = UUID(str(input.organization_id))
-                target_user_id = UUID(str(input.user_id))
-
-                # Get organization
-                org_stmt = select(OrganizationModel).where(OrganizationModel.id == org_id)
-                org_result = await session.execute(org_stmt)
-                org_model = org_result.scalar_one_or_none()
-
-                if not org_model:
-                    msg = "Organization not found"
-                    raise ValueError(msg)
-
-                # Check authorization: owner or admin
-                is_owner = org_model.owner_id == current_user_id
-
-                member_stmt = select(OrganizationMemberModel).where(
-                    (OrganizationMemberModel.organization_id == org_id)
-                    & (OrganizationMemberModel.user_id == current_user_id)
-                    & (
-                        OrganizationMemberModel.organization_role.in_(
-                            [OrganizationRole.ADMIN, OrganizationRole.OWNER]
-                        )
+                # Commits on exit; rolls back on any error
+                async with session.begin():
+                    # The target user lookup does not depend on the organization or admin
+                    # check, and the loader has its own session, so run both concurrently
+                    org_result, target_user = await asyncio.gather(
+                        session.execute(
+                            _ORG_ADMIN_CHECK_STMT,
+                            {"organization_id": org_id, "user_id": current_user_id},
+                        ),
+                        info.context["user_loader"].load(target_user_id),
                     )
-                )
-                member_result = await session.execute(member_stmt)
-                is_admin = member_result.scalar_one_or_none() is not None
+                    row = org_result.first()
 
-                if not is_owner and not is_admin:
-                    msg = "Insufficient permissions to add members to this organization"
-                    raise ValueError(msg)
+                    if row is None:
+                        msg = "Organization not found"
+                        raise ValueError(msg)
 
-                # Verify target user exists
-                user_stmt = select(UserModel).where(UserModel.id == target_user_id)
-                user_result = await session.execute(user_stmt)
-                target_user = user_result.scalar_one_or_none()
+                    org_model, is_admin = row
 
-                if not target_user:
-                    msg = "User not found"
-                    raise ValueError(msg)
+                    # Check authorization: owner or admin
+                    is_owner = org_model.owner_id == current_user_id
 
-                # Convert GraphQL enum to database enum
-                role = OrganizationRole(input.role.value)
+                    if not is_owner and not is_admin:
+                        msg = "Insufficient permissions to add members to this organization"
+                        raise AuthorizationError(msg)
 
-                # Create new organization member
-                new_member = OrganizationMemberModel(
-                    organization_id=org_id,
-                    user_id=target_user_id,
-                    organization_role=role,
-                )
+                    # Verify target user exists
+                    if not target_user:
+                        msg = "User not found"
+                        raise ValueError(msg)
 
-                session.add(new_member)
-                await session.commit()
-                await session.refresh(new_member)
+                    # Convert GraphQL enum to database enum
+                    role = _GQL_TO_DB_ROLE[input.role]
 
-                return OrganizationMember.from_model(new_member)
+                    # Create new organization member. The target user came from the
+                    # loader's session, so attach it to this one without reloading it.
+                    new_member = OrganizationMemberModel(
+                        organization_id=org_id,
+                        user_id=target_user_id,
+                        organization_role=role,
+                        user=await session.merge(target_user, load=False),
+                    )
 
+                    session.add(new_member)
             except IntegrityError as e:
-                await session.rollback()
-                if "unique" in str(e).lower():
+                if pg_error_code(e) == UNIQUE_VIOLATION:
                     msg = "User is already a member of this organization"
-                    raise ValueError(msg)
+                    raise ValueError(msg) from e
                 msg = "Failed to add member due to database constraint"
-                raise ValueError(msg)
+                raise ValueError(msg) from e
 
-        # Fallback if session doesn't yield
-        msg = "Database session unavailable"
-        raise RuntimeError(msg)
+            return OrganizationMember.from_model(new_member)
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def remove_organization_member(
         self, info: strawberry.types.Info, organization_id: strawberry.ID, user_id: strawberry.ID
     ) -> bool:
@@ -441,77 +571,57 @@ class Mutation:
             - Only owner or admins can remove members
             - Cannot remove the owner
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
-                current_user_id = user.id
-                org_id = UUID(str(organization_id))
-                target_user_id = UUID(str(user_id))
-
-                # Get organization
-                org_stmt = select(OrganizationModel).where(OrganizationModel.id == org_id)
-                org_result = await session.execute(org_stmt)
-                org_model = org_result.scalar_one_or_none()
-
-                if not org_model:
-                    msg = "Organization not found"
-                    raise ValueError(msg)
-
-                # Cannot remove the owner
-                if org_model.owner_id == target_user_id:
-                    msg = "Cannot remove the organization owner"
-                    raise ValueError(msg)
-
-                # Check authorization: owner or admin
-                is_owner = org_model.owner_id == current_user_id
+        async with session_scope() as session:
+            # Authenticated user (guaranteed by IsAuthenticated)
+            user = info.context["user"]
+            current_user_id = user.id
+            org_id = _parse_uuid(organization_id)
+            target_user_id = _parse_uuid(user_id)
+            if org_id is None or target_user_id is None:
+                msg = "Invalid organization or user ID"
+                raise InvalidInputError(msg)
+
+            # Get organization together with the caller's admin flag
+            result = await session.execute(
+                _ORG_ADMIN_CHECK_STMT,
+                {"organization_id": org_id, "user_id": current_user_id},
+            )
+            row = result.first()
+
+            if row is None:
+                msg = "Organization not found"
+                raise ValueError(msg)
 
-                member_stmt = select(OrganizationMemberModel).where(
-                    (OrganizationMemberModel.organization_id == org_id)
-                    & (OrganizationMemberModel.user_id == current_user_id)
-                    & (
-                        OrganizationMemberModel.organization_role.in_(
-                            [OrganizationRole.ADMIN, OrganizationRole.OWNER]
-                        )
-                    )
-                )
-                member_result = await session.execute(member_stmt)
-                is_admin = member_result.scalar_one_or_none() is not None
+            org_model, is_admin = row
 
-                if not is_owner and not is_admin:
-                    msg = "Insufficient permissions to remove members from this organization"
-                    raise ValueError(msg)
+            # Cannot remove the owner
+            if org_model.owner_id == target_user_id:
+                msg = "Cannot remove the organization owner"
+                raise ValueError(msg)
 
-                # Get the member to remove
-                target_member_stmt = select(OrganizationMemberModel).where(
-                    (OrganizationMemberModel.organization_id == org_id)
-                    & (OrganizationMemberModel.user_id == target_user_id)
-                )
-                target_member_result = await session.execute(target_member_stmt)
-                target_member = target_member_result.scalar_one_or_none()
+            # Check authorization: owner or admin
+            is_owner = org_model.owner_id == current_user_id
 
-                if not target_member:
-                    msg = "Member not found in this organization"
-                    raise ValueError(msg)
+            if not is_owner and not is_admin:
+                msg = "Insufficient permissions to remove members from this organization"
+                raise AuthorizationError(msg)
 
-                await session.delete(target_member)
-                await session.commit()
+            # Get the member to remove
+            target_member_result = await session.execute(
+                _ORG_MEMBER_STMT, {"organization_id": org_id, "user_id": target_user_id}
+            )
+            target_member = target_member_result.scalar_one_or_none()
 
-                return True
+            if not target_member:
+                msg = "Member not found in this organization"
+                raise ValueError(msg)
 
-            except ValueError:
-                await session.rollback()
-                raise
+            await session.delete(target_member)
+            await session.commit()
 
-        return False
+            return True
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def update_member_role(
         self,
         info: strawberry.types.Info,
@@ -534,67 +644,53 @@ class Mutation:
             - Only the owner can update member roles
             - Cannot change the owner's role
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
-                current_user_id = user.id
-                org_id = UUID(str(organization_id))
-                target_user_id = UUID(str(user_id))
-
-                # Get organization
-                org_stmt = select(OrganizationModel).where(OrganizationModel.id == org_id)
-                org_result = await session.execute(org_stmt)
-                org_model = org_result.scalar_one_or_none()
-
-                if not org_model:
-                    msg = "Organization not found"
-                    raise ValueError(msg)
-
-                # Only owner can update roles
-                if org_model.owner_id != current_user_id:
-                    msg = "Only the owner can update member roles"
-                    raise ValueError(msg)
-
-                # Cannot change owner's role
-                if org_model.owner_id == target_user_id:
-                    msg = "Cannot change the owner's role"
-                    raise ValueError(msg)
+        async with session_scope() as session:
+            # Authenticated user (guaranteed by IsAuthenticated)
+            user = info.context["user"]
+            current_user_id = user.id
+            org_id = _parse_uuid(organization_id)
+            target_user_id = _parse_uuid(user_id)
+            if org_id is None or target_user_id is None:
+                msg = "Invalid organization or user ID"
+                raise InvalidInputError(msg)
+
+            # Get organization (only owner_id is needed, so skip its collections)
+            org_model = await session.get(
+                OrganizationModel, org_id, options=[Load(OrganizationModel).lazyload("*")]
+            )
+
+            if not org_model:
+                msg = "Organization not found"
+                raise ValueError(msg)
 
-                # Get the member to update
-                member_stmt = select(OrganizationMemberModel).where(
-                    (OrganizationMemberModel.organization_id == org_id)
-                    & (OrganizationMemberModel.user_id == target_user_id)
-                )
-                member_result = await session.execute(member_stmt)
-                member = member_result.scalar_one_or_none()
+            # Only owner can update roles
+            if org_model.owner_id != current_user_id:
+                msg = "Only the owner can update member roles"
+                raise AuthorizationError(msg)
 
-                if not member:
-                    msg = "Member not found in this organization"
-                    raise ValueError(msg)
+            # Cannot change owner's role
+            if org_model.owner_id == target_user_id:
+                msg = "Cannot change the owner's role"
+                raise ValueError(msg)
 
-                # Convert GraphQL enum to database enum
-                new_role = OrganizationRole(role.value)
-                member.organization_role = new_role
+            # Get the member to update
+            member_result = await session.execute(
+                _ORG_MEMBER_STMT, {"organization_id": org_id, "user_id": target_user_id}
+            )
+            member = member_result.scalar_one_or_none()
 
-                await session.commit()
-                await session.refresh(member)
+            if not member:
+                msg = "Member not found in this organization"
+                raise ValueError(msg)
 
-                return OrganizationMember.from_model(member)
+            # Convert GraphQL enum to database enum
+            member.organization_role = _GQL_TO_DB_ROLE[role]
 
-            except ValueError:
-                await session.rollback()
-                raise
+            await session.commit()
 
-        return None
+            return OrganizationMember.from_model(member)
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def create_space(self, info: strawberry.types.Info, input: CreateSpaceInput) -> Space:
         """
         Create a new space.
@@ -609,77 +705,83 @@ class Mutation:
             - Any authenticated user can create a space
             - Creator automatically becomes the owner
         """
-        async for session in get_session():
+        # Authenticated user (guaranteed by IsAuthenticated)
+        user_id = info.context["user"].id
+        organization_id = _parse_uuid(input.organization_id)
+        if organization_id is None:
+            msg = "Invalid organization ID"
+            raise InvalidInputError(msg)
+
+        # Insert under the plain slug; ON CONFLICT DO NOTHING means a taken slug
+        # comes back as no row instead of aborting the transaction
+        base_slug = slugify(input.name) or uuid4().hex[:8]
+        space_values = {
+            "organization_id": organization_id,
+            "name": input.name,
+            "slug": base_slug,
+            "description": input.description,
+            "icon_color": input.icon_color,
+            "is_public": False,  # Default to private
+            "max_members": None,  # No limit by default
+            "owner_id": user_id,
+        }
+
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required to create a space"
-                    raise ValueError(msg)
-
-                user_id = user.id
-                organization_id = UUID(str(input.organization_id))
-
-                # Generate unique slug from space name
-                slug = await generate_unique_slug(input.name, session, SpaceModel)
-
-                # Create new space instance
-                space_model = SpaceModel(
-                    organization_id=organization_id,
-                    name=input.name,
-                    slug=slug,
-                    description=input.description,
-                    icon_color=input.icon_color,
-                    is_public=False,  # Default to private
-                    max_members=None,  # No limit by default
-                    owner_id=user_id,
-                )
-
-                session.add(space_model)
-                await session.flush()  # Flush to get the space ID
-
-                # Add creator as owner in space_members
-                space_member = SpaceMemberModel(
-                    space_id=space_model.id, user_id=user_id, member_role=MemberRole.OWNER
-                )
-
-                session.add(space_member)
-                await session.commit()
+                # Commits on exit; rolls back on any error
+                async with session.begin():
+                    space_id = (
+                        await session.execute(_insert_space_stmt(space_values))
+                    ).scalar_one_or_none()
+
+                    # Slug already taken (by any space, in any organization): retry
+                    # with a random suffix so a second space with the same name is
+                    # still created
+                    retries_left = _SLUG_RETRIES
+                    while space_id is None and retries_left > 0:
+                        retries_left -= 1
+                        space_values["slug"] = suffixed_slug(base_slug)
+                        space_id = (
+                            await session.execute(_insert_space_stmt(space_values))
+                        ).scalar_one_or_none()
+
+                    if space_id is None:
+                        # Every slug was taken. Only return an existing space if it is
+                        # the one this same request created (a concurrent retry).
+                        # Relationships eager loaded via lazy='selectin'.
+                        existing_result = await session.execute(
+                            _SAME_SPACE_REQUEST_STMT,
+                            {
+                                "slug": base_slug,
+                                "owner_id": user_id,
+                                "organization_id": organization_id,
+                                "name": input.name,
+                            },
+                        )
+                        existing_space = existing_result.scalar_one_or_none()
 
-                # Refresh the model (relationships eager loaded via lazy='selectin')
-                await session.refresh(space_model)
+                        if existing_space:
+                            return Space.from_model(existing_space)
 
-                return Space.from_model(space_model)
+                        msg = "Failed to create space due to database constraint"
+                        raise ValueError(msg)
 
-            except IntegrityError as e:
-                await session.rollback()
-
-                # Handle slug uniqueness violation (idempotency for retries)
-                # If slug already exists, return the existing space for this user
-                if "unique_constraint" in str(e).lower() or "slug" in str(e).lower():
-                    # Query for existing space with same slug owned by this user
-                    # Relationships eager loaded via lazy='selectin' in model
-                    existing_stmt = select(SpaceModel).where(
-                        (SpaceModel.slug == slug) & (SpaceModel.owner_id == user_id)
+                    # Add creator as owner in space_members
+                    session.add(
+                        SpaceMemberModel(
+                            space_id=space_id, user_id=user_id, member_role=MemberRole.OWNER
+                        )
                     )
-                    existing_result = await session.execute(existing_stmt)
-                    existing_space = existing_result.scalar_one_or_none()
-
-                    if existing_space:
-                        # Return existing space (idempotent behavior)
-                        return Space.from_model(existing_space)
-
-                # For other integrity errors, raise generic error
+            except IntegrityError as e:
                 msg = "Failed to create space due to database constraint"
-                raise ValueError(msg)
+                raise ValueError(msg) from e
 
-        # Fallback if session doesn't yield for my MyPy
-        msg = "Database session unavailable"
-        raise RuntimeError(msg)
+            # Load the new space (relationships eager loaded via lazy='selectin')
+            space_model = await session.get_one(SpaceModel, space_id)
 
-    @strawberry.mutation
+            return Space.from_model(space_model)
+
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def update_space(
         self, info: strawberry.types.Info, id: strawberry.ID, input: UpdateSpaceInput
     ) -> Space | None:
@@ -696,68 +798,48 @@ class Mutation:
         Authorization:
             - Only owner or members with EDITOR role can update
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user (guaranteed by IsAuthenticated)
+            user_id = info.context["user"].id
+            space_id = _parse_uuid(id)
+            if space_id is None:
+                return None
 
-                if not user:
-                    return None
+            # Get space and the user's membership in one round-trip
+            result = await session.execute(
+                _SPACE_WITH_MEMBERSHIP_STMT, {"space_id": space_id, "user_id": user_id}
+            )
+            row = result.first()
 
-                user_id = user.id
-                space_id = UUID(str(id))
+            if row is None:
+                return None
 
-                # Get space
-                stmt = select(SpaceModel).where(SpaceModel.id == space_id)
-                result = await session.execute(stmt)
-                space_model = result.scalar_one_or_none()
+            space_model, member = row
 
-                if not space_model:
-                    return None
+            # Check authorization: owner or editor
+            is_owner = space_model.owner_id == user_id
+            is_editor = member is not None and member.member_role == MemberRole.EDITOR
 
-                # Check authorization: owner or editor
-                is_owner = space_model.owner_id == user_id
+            if not is_owner and not is_editor:
+                msg = "Insufficient permissions to update this space"
+                raise AuthorizationError(msg)
 
-                # Check if user is an editor member
-                member_stmt = select(SpaceMemberModel).where(
-                    (SpaceMemberModel.space_id == space_id)
-                    & (SpaceMemberModel.user_id == user_id)
-                    & (SpaceMemberModel.member_role == MemberRole.EDITOR)
+            # Update fields if provided (no COMMIT for a no-op update)
+            updates = _provided_fields(input, "name", "description", "icon_color")
+            if updates:
+                stmt = (
+                    update(SpaceModel)
+                    .where(SpaceModel.id == space_id)
+                    .values(**updates)
+                    .returning(SpaceModel)
                 )
-                member_result = await session.execute(member_stmt)
-                is_editor = member_result.scalar_one_or_none() is not None
-
-                if not is_owner and not is_editor:
-                    msg = "Insufficient permissions to update this space"
-                    raise ValueError(msg)
-
-                # Update fields if provided
-                if input.name is not None:
-                    space_model.name = input.name
-                if input.description is not None:
-                    space_model.description = input.description
-                if input.icon_color is not None:
-                    space_model.icon_color = input.icon_color
+                space_model = (await session.execute(stmt)).scalar_one()
 
                 await session.commit()
 
-                # Refresh the model (relationships eager loaded via lazy='selectin')
-                await session.refresh(space_model)
+            return Space.from_model(space_model)
 
-                return Space.from_model(space_model)
-
-            except ValueError as e:
-                await session.rollback()
-                # Re-raise authorization errors
-                if "permissions" in str(e):
-                    raise
-                # Invalid UUID format
-                return None
-
-        return None
-
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def delete_space(self, info: strawberry.types.Info, id: strawberry.ID) -> bool:
         """
         Delete a space by ID.
@@ -771,48 +853,31 @@ class Mutation:
         Authorization:
             - Only the owner can delete a space
         """
-        async for session in get_session():
-            try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    return False
-
-                user_id = user.id
-                space_id = UUID(str(id))
-
-                # Get space
-                stmt = select(SpaceModel).where(SpaceModel.id == space_id)
-                result = await session.execute(stmt)
-                space_model = result.scalar_one_or_none()
-
-                if not space_model:
-                    return False
+        async with session_scope() as session:
+            # Authenticated user (guaranteed by IsAuthenticated)
+            user_id = info.context["user"].id
+            space_id = _parse_uuid(id)
+            if space_id is None:
+                return False
 
-                # Check authorization: only owner can delete
-                if space_model.owner_id != user_id:
-                    msg = "Only the owner can delete this space"
-                    raise ValueError(msg)
+            # Get space
+            space_model = await session.get(SpaceModel, space_id)
 
-                await session.delete(space_model)
-                await session.commit()
+            if not space_model:
+                return False
 
-                return True
+            # Check authorization: only owner can delete
+            if space_model.owner_id != user_id:
+                msg = "Only the owner can delete this space"
+                raise AuthorizationError(msg)
 
-            except ValueError as e:
-                await session.rollback()
-                # Re-raise authorization errors
-                if "owner" in str(e):
-                    raise
-                # Invalid UUID format
-                return False
+            await session.delete(space_model)
+            await session.commit()
 
-        return False
+            return True
 
-    @strawberry.mutation
-    async def delete_thread(self, info: strawberry.types.Info, id: strawberry.ID) -> bool:  # noqa: PLR0915
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
+    async def delete_thread(self, info: strawberry.types.Info, id: strawberry.ID) -> bool:
         """
         Delete a thread by ID.
 
@@ -832,105 +897,64 @@ class Mutation:
               deleteThread(id: "thread-uuid")
             }
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
+                # Authenticated user (guaranteed by IsAuthenticated)
+                user = info.context["user"]
                 user_id = user.id
-                thread_id = UUID(str(id))
-
-                # Get thread
-                stmt = select(ThreadModel).where(ThreadModel.id == thread_id)
-                result = await session.execute(stmt)
-                thread_model = result.scalar_one_or_none()
+                thread_id = _parse_uuid(id)
+                if thread_id is None:
+                    msg = "Invalid thread ID"
+                    raise InvalidInputError(msg)
+
+                # Get the thread's creator, its space owner, the user's membership and org
+                # admin flag at once
+                result = await session.execute(
+                    _THREAD_ACCESS_FLAGS_STMT, {"thread_id": thread_id, "user_id": user_id}
+                )
+                row = result.first()
 
-                if not thread_model:
+                if row is None:
                     msg = "Thread not found"
                     raise ValueError(msg)
 
+                created_by, space_id, space_owner_id, is_member, is_org_admin = row
+
                 # Check authorization based on thread type
-                is_creator = thread_model.created_by == user_id
+                is_creator = created_by == user_id
 
-                if thread_model.space_id:
+                if space_id:
                     # Space thread - check space permissions
-                    space_stmt = select(SpaceModel).where(SpaceModel.id == thread_model.space_id)
-                    space_result = await session.execute(space_stmt)
-                    space_model = space_result.scalar_one_or_none()
-
-                    if not space_model:
+                    if space_owner_id is None:
                         msg = "Space not found"
                         raise ValueError(msg)
 
-                    is_owner = space_model.owner_id == user_id
-
-                    # Check if user is a member of the space
-                    member_stmt = select(SpaceMemberModel).where(
-                        (SpaceMemberModel.space_id == thread_model.space_id)
-                        & (SpaceMemberModel.user_id == user_id)
-                    )
-                    member_result = await session.execute(member_stmt)
-                    is_member = member_result.scalar_one_or_none() is not None
+                    is_owner = space_owner_id == user_id
 
                     if not is_creator and not is_owner and not is_member:
                         msg = "Insufficient permissions to delete this thread"
-                        raise ValueError(msg)
-                elif not is_creator:
-                    # Check if user is organization admin or owner
-                    org_member_stmt = select(OrganizationMemberModel).where(
-                        (OrganizationMemberModel.organization_id == thread_model.organization_id)
-                        & (OrganizationMemberModel.user_id == user_id)
-                        & (
-                            OrganizationMemberModel.organization_role.in_(
-                                [OrganizationRole.ADMIN, OrganizationRole.OWNER]
-                            )
-                        )
-                    )
-                    org_member_result = await session.execute(org_member_stmt)
-                    is_org_admin = org_member_result.scalar_one_or_none() is not None
-
-                    if not is_org_admin:
-                        msg = "Only the creator or organization admin can delete org-wide threads"
-                        raise ValueError(msg)
-
-                await session.delete(thread_model)
+                        raise AuthorizationError(msg)
+                elif not is_creator and not is_org_admin:
+                    # Org-wide thread - only the creator or an org admin/owner can delete
+                    msg = "Only the creator or organization admin can delete org-wide threads"
+                    raise AuthorizationError(msg)
+
+                # RETURNING confirms the row was still there (a concurrent delete may have won)
+                deleted_id = (
+                    await session.execute(_DELETE_THREAD_STMT, {"thread_id": thread_id})
+                ).scalar_one_or_none()
                 await session.commit()
 
-                return True
+                return deleted_id is not None
 
             except IntegrityError as e:
-                await session.rollback()
-                error_str = str(e).lower()
-
-                # Parse IntegrityError and provide user-friendly messages
-                # while hiding database schema details
-                if "fk_threads_organization_id" in error_str:
-                    msg = "Invalid organization specified"
-                elif "fk_threads_space_id" in error_str or "fk_spaces_" in error_str:
-                    msg = "Invalid space specified"
-                elif "not-null constraint" in error_str:
-                    msg = "Required field missing"
-                elif "unique constraint" in error_str:
-                    msg = "Duplicate entry already exists"
-                else:
-                    # Generic message for unknown integrity errors
-                    msg = "Invalid data provided"
+                msg = _thread_integrity_error_message(e)
 
                 logger.exception("IntegrityError in mutation")
 
                 raise ValueError(msg) from e
-            except ValueError:
-                await session.rollback()
-                raise  # Re-raise ValueError to propagate to GraphQL
-
-        return False
 
-    @strawberry.mutation
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
     async def create_thread(
         self, info: strawberry.types.Info, input: CreateThreadInput
     ) -> Thread | None:
@@ -962,33 +986,38 @@ class Mutation:
               }
             }
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
+                # Authenticated user (guaranteed by IsAuthenticated)
+                user = info.context["user"]
                 user_id = user.id
-                org_id = UUID(str(input.organization_id))
-                space_id = UUID(str(input.space_id)) if input.space_id else None
+                org_id = _parse_uuid(input.organization_id)
+                if org_id is None:
+                    msg = "Invalid organization ID"
+                    raise InvalidInputError(msg)
+                space_id: UUID | None = None
+                if input.space_id:
+                    space_id = _parse_uuid(input.space_id)
+                    if space_id is None:
+                        msg = "Invalid space ID"
+                        raise InvalidInputError(msg)
 
                 # TODO: Verify user has access to the organization (via organization_members)
                 # For now, we just check space access if space_id is provided
 
                 if space_id:
-                    # Verify user has access to the space
-                    stmt = select(SpaceModel).where(SpaceModel.id == space_id)
-                    result = await session.execute(stmt)
-                    space_model = result.scalar_one_or_none()
+                    # Verify user has access to the space (space + membership in one round-trip)
+                    result = await session.execute(
+                        _SPACE_WITH_MEMBERSHIP_STMT, {"space_id": space_id, "user_id": user_id}
+                    )
+                    row = result.first()
 
-                    if not space_model:
+                    if row is None:
                         msg = "Space not found"
                         raise ValueError(msg)
 
+                    space_model, member = row
+
                     # Verify space belongs to the organization
                     if space_model.organization_id != org_id:
                         msg = "Space does not belong to the specified organization"
@@ -996,16 +1025,11 @@ class Mutation:
 
                     # Check if user is owner or member
                     is_owner = space_model.owner_id == user_id
-                    member_stmt = select(SpaceMemberModel).where(
-                        (SpaceMemberModel.space_id == space_id)
-                        & (SpaceMemberModel.user_id == user_id)
-                    )
-                    member_result = await session.execute(member_stmt)
-                    is_member = member_result.scalar_one_or_none() is not None
+                    is_member = member is not None
 
                     if not is_owner and not is_member:
                         msg = "Insufficient permissions to create thread in this space"
-                        raise ValueError(msg)
+                        raise AuthorizationError(msg)
 
                 # Create new thread
                 thread_model = ThreadModel(
@@ -1016,43 +1040,23 @@ class Mutation:
                     result=input.result,
                     title=input.title,
                     confidence_score=input.confidence_score,
+                    messages=[],  # New thread: nothing to load, so no refresh needed
                 )
 
                 session.add(thread_model)
                 await session.commit()
-                await session.refresh(thread_model)
 
                 return Thread.from_model(thread_model)
 
             except IntegrityError as e:
-                await session.rollback()
-                error_str = str(e).lower()
-
-                # Parse IntegrityError and provide user-friendly messages
-                # while hiding database schema details
-                if "fk_threads_organization_id" in error_str:
-                    msg = "Invalid organization specified"
-                elif "fk_threads_space_id" in error_str or "fk_spaces_" in error_str:
-                    msg = "Invalid space specified"
-                elif "not-null constraint" in error_str:
-                    msg = "Required field missing"
-                elif "unique constraint" in error_str:
-                    msg = "Duplicate entry already exists"
-                else:
-                    # Generic message for unknown integrity errors
-                    msg = "Invalid data provided"
+                msg = _thread_integrity_error_message(e)
 
                 logger.exception("IntegrityError in mutation")
 
                 raise ValueError(msg) from e
-            except ValueError:
-                await session.rollback()
-                raise  # Re-raise ValueError to propagate to GraphQL
-
-        return None
 
-    @strawberry.mutation
-    async def update_thread(  # noqa: PLR0915
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
+    async def update_thread(
         self, info: strawberry.types.Info, id: strawberry.ID, input: UpdateThreadInput
     ) -> Thread | None:
         """
@@ -1084,98 +1088,59 @@ class Mutation:
               }
             }
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
-
-                if not user:
-                    msg = "Authentication required"
-                    raise ValueError(msg)
-
+                # Authenticated user (guaranteed by IsAuthenticated)
+                user = info.context["user"]
                 user_id = user.id
-                thread_id = UUID(str(id))
-
-                # Get thread
-                stmt = select(ThreadModel).where(ThreadModel.id == thread_id)
-                result = await session.execute(stmt)
-                thread_model = result.scalar_one_or_none()
+                thread_id = _parse_uuid(id)
+                if thread_id is None:
+                    msg = "Invalid thread ID"
+                    raise InvalidInputError(msg)
+
+                # Get thread, its space and the user's org admin flag in one round-trip
+                result = await session.execute(
+                    _THREAD_WITH_ACCESS_STMT, {"thread_id": thread_id, "user_id": user_id}
+                )
+                row = result.first()
 
-                if not thread_model:
+                if row is None:
                     msg = "Thread not found"
                     raise ValueError(msg)
 
+                thread_model, space_model, is_org_admin = row
+
                 # Check authorization based on thread type
                 is_creator = thread_model.created_by == user_id
 
                 if thread_model.space_id:
-                    # Space thread - check space permissions
-                    space_stmt = select(SpaceModel).where(SpaceModel.id == thread_model.space_id)
-                    space_result = await session.execute(space_stmt)
-                    space_model = space_result.scalar_one_or_none()
-
-                    if not space_model:
-                        msg = "Space not found"
-                        raise ValueError(msg)
-
-                    is_owner = space_model.owner_id == user_id
-
-                    if not is_creator and not is_owner:
-                        msg = "Insufficient permissions to update this thread"
-                        raise ValueError(msg)
-                elif not is_creator:
-                    # Check if user is organization admin or owner
-                    org_member_stmt = select(OrganizationMemberModel).where(
-                        (OrganizationMemberModel.organization_id == thread_model.organization_id)
-                        & (OrganizationMemberModel.user_id == user_id)
-                        & (
-                            OrganizationMemberModel.organization_role.in_(
-                                [OrganizationRole.ADMIN, OrganizationRole.OWNER]
-                            )
-                        )
-                    )
-                    org_member_result = await session.execute(org_member_stmt)
-                    is_org_admin = org_member_result.scalar_one_or_none() is not None
-
-                    if not is_org_admin:
-                        msg = "Only the creator or organization admin can update org-wide threads"
-                        raise ValueError(msg)
-
-                # Update fields if provided
-                if input.title is not None:
-                    thread_model.title = input.title
-                if input.result is not None:
-                    thread_model.result = input.result
-
-                await session.commit()
-                await session.refresh(thread_model)
+                    # Space thread - the creator is authorized without checking the space
+                    if not is_creator:
+                        if not space_model:
+                            msg = "Space not found"
+                            raise ValueError(msg)
+
+                        if space_model.owner_id != user_id:
+                            msg = "Insufficient permissions to update this thread"
+                            raise AuthorizationError(msg)
+                elif not is_creator and not is_org_admin:
+                    # Org-wide thread - only the creator or an org admin/owner can update
+                    msg = "Only the creator or organization admin can update org-wide threads"
+                    raise AuthorizationError(msg)
+
+                # Update fields if provided (no COMMIT for a no-op update)
+                updates = _provided_fields(input, "title", "result")
+                if updates:
+                    for field, value in updates.items():
+                        setattr(thread_model, field, value)
+
+                    await session.commit()
 
                 return Thread.from_model(thread_model)
 
             except IntegrityError as e:
-                await session.rollback()
-                error_str = str(e).lower()
-
-                # Parse IntegrityError and provide user-friendly messages
-                # while hiding database schema details
-                if "fk_threads_organization_id" in error_str:
-                    msg = "Invalid organization specified"
-                elif "fk_threads_space_id" in error_str or "fk_spaces_" in error_str:
-                    msg = "Invalid space specified"
-                elif "not-null constraint" in error_str:
-                    msg = "Required field missing"
-                elif "unique constraint" in error_str:
-                    msg = "Duplicate entry already exists"
-                else:
-                    # Generic message for unknown integrity errors
-                    msg = "Invalid data provided"
+                msg = _thread_integrity_error_message(e)
 
                 logger.exception("IntegrityError in mutation")
 
                 raise ValueError(msg) from e
-            except ValueError:
-                await session.rollback()
-                raise  # Re-raise ValueError to propagate to GraphQL
-
-        return None
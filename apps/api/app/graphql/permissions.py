@@ -0,0 +1,16 @@
+"""Strawberry permission classes shared by GraphQL resolvers."""
+
+from typing import Any
+
+from strawberry.permission import BasePermission
+from strawberry.types import Info
+
+
+class IsAuthenticated(BasePermission):
+    """Allow the field only when the request carries an authenticated user."""
+
+    message = "Authentication required"
+
+    def has_permission(self, _source: Any, info: Info, **_kwargs: Any) -> bool:
+        """Check the user resolved once per request by the context getter."""
+        return info.context["user"] is not None
@@ -8,7 +8,7 @@ from sqlalchemy import extract, func, select
 from sqlalchemy.orm import joinedload
 import strawberry
 
-from app.db.session import get_session
+from app.db.session import session_scope
 from app.models.document import Document as DocumentModel
 from app.models.organization import Organization as OrganizationModel
 from app.models.organization_member import OrganizationMember as OrganizationMemberModel
@@ -39,12 +39,10 @@ class Query:
     @strawberry.field
     async def user(self, id: strawberry.ID) -> User | None:
         """Get a user by ID."""
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                user_id = UUID(str(id))
-                stmt = select(UserModel).where(UserModel.id == user_id)
-                result = await session.execute(stmt)
-                user_model = result.scalar_one_or_none()
+                user_id = UUID(id)
+                user_model = await session.get(UserModel, user_id)
 
                 if user_model:
                     return User.from_model(user_model)
@@ -52,23 +50,21 @@ class Query:
             except ValueError:
                 # Invalid UUID format
                 return None
-        return None
 
     @strawberry.field
     async def users(self, limit: int = 10, offset: int = 0) -> list[User]:
         """Get a list of users with pagination."""
-        async for session in get_session():
+        async with session_scope() as session:
             stmt = select(UserModel).limit(limit).offset(offset)
             result = await session.execute(stmt)
             user_models = result.scalars().all()
 
             return [User.from_model(user) for user in user_models]
-        return []
 
     @strawberry.field
     async def user_by_email(self, email: str) -> User | None:
         """Get a user by email address."""
-        async for session in get_session():
+        async with session_scope() as session:
             stmt = select(UserModel).where(UserModel.email == email)
             result = await session.execute(stmt)
             user_model = result.scalar_one_or_none()
@@ -76,7 +72,6 @@ class Query:
             if user_model:
                 return User.from_model(user_model)
             return None
-        return None
 
     @strawberry.field
     async def health(self) -> str:
@@ -121,10 +116,9 @@ class Query:
               }
             }
         """
-        async for session in get_session():
-            # Get the authenticated user from the request context
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user, resolved once per request by the context getter
+            user = info.context["user"]
 
             if not user:
                 # No authenticated user - return empty results
@@ -136,9 +130,9 @@ class Query:
             search_service = get_vector_search_service()
 
             # Convert strawberry.ID to UUID for space_id and document_ids
-            space_id = UUID(str(input.space_id)) if input.space_id else None
+            space_id = UUID(input.space_id) if input.space_id else None
             document_ids = (
-                [UUID(str(doc_id)) for doc_id in input.document_ids] if input.document_ids else None
+                [UUID(doc_id) for doc_id in input.document_ids] if input.document_ids else None
             )
 
             # If no specific space_id provided, get all spaces user has access to
@@ -175,8 +169,6 @@ class Query:
             # Convert service results to GraphQL types
             return [SearchResult.from_service_result(result) for result in results]
 
-        return []
-
     @strawberry.field
     async def spaces(
         self, info: strawberry.types.Info, limit: int = 10, offset: int = 0
@@ -191,10 +183,9 @@ class Query:
         Returns:
             List of spaces
         """
-        async for session in get_session():
-            # Get the authenticated user from the request context
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user, resolved once per request by the context getter
+            user = info.context["user"]
 
             if not user:
                 return []
@@ -217,8 +208,6 @@ class Query:
 
             return [Space.from_model(space) for space in space_models]
 
-        return []
-
     @strawberry.field
     async def documents(
         self,
@@ -238,10 +227,9 @@ class Query:
         Returns:
             List of documents
         """
-        async for session in get_session():
-            # Get the authenticated user from the request context
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user, resolved once per request by the context getter
+            user = info.context["user"]
 
             if not user:
                 return []
@@ -251,7 +239,7 @@ class Query:
             # Build query based on whether space_id is provided
             if space_id:
                 # Filter by specific space
-                space_uuid = UUID(str(space_id))
+                space_uuid = UUID(space_id)
 
                 # Verify user has access to this space
                 space_access_stmt = (
@@ -302,8 +290,6 @@ class Query:
 
             return [Document.from_model(doc) for doc in document_models]
 
-        return []
-
     @strawberry.field
     async def space(self, info: strawberry.types.Info, id: strawberry.ID) -> Space | None:
         """
@@ -315,17 +301,16 @@ class Query:
         Returns:
             The space if found and user has access, None otherwise
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
+                # Authenticated user, resolved once per request by the context getter
+                user = info.context["user"]
 
                 if not user:
                     return None
 
                 user_id = user.id
-                space_id = UUID(str(id))
+                space_id = UUID(id)
 
                 # Get space and verify user has access (owner or member)
                 # Relationships are eager loaded via lazy='selectin' in model
@@ -350,8 +335,6 @@ class Query:
                 # Invalid UUID format
                 return None
 
-        return None
-
     @strawberry.field
     async def threads(
         self,
@@ -386,10 +369,9 @@ class Query:
               }
             }
         """
-        async for session in get_session():
-            # Get the authenticated user from the request context
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user, resolved once per request by the context getter
+            user = info.context["user"]
 
             if not user:
                 return []
@@ -399,7 +381,7 @@ class Query:
             # Build query based on filters
             if space_id:
                 # Filter by specific space
-                space_uuid = UUID(str(space_id))
+                space_uuid = UUID(space_id)
 
                 # Verify user has access to this space
                 space_access_stmt = (
@@ -430,7 +412,7 @@ class Query:
                 )
             elif organization_id:
                 # Filter by organization (org-wide threads)
-                org_uuid = UUID(str(organization_id))
+                org_uuid = UUID(organization_id)
 
                 # TODO: Add organization membership verification once we have organization_members access control
                 # For now, just filter by organization_id
@@ -460,8 +442,6 @@ class Query:
             logger.info(f"Retrieved {len(thread_models)} threads for user {user_id}")
             return [Thread.from_model(thread) for thread in thread_models]
 
-        return []
-
     @strawberry.field
     async def thread(self, info: strawberry.types.Info, id: strawberry.ID) -> Thread | None:
         """
@@ -485,17 +465,16 @@ class Query:
               }
             }
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
+                # Authenticated user, resolved once per request by the context getter
+                user = info.context["user"]
 
                 if not user:
                     return None
 
                 user_id = user.id
-                thread_id = UUID(str(id))
+                thread_id = UUID(id)
 
                 # Get thread and verify user has access
                 # For threads with space_id: check space membership
@@ -537,8 +516,6 @@ class Query:
                 # Invalid UUID format
                 return None
 
-        return None
-
     @strawberry.field
     async def organizations(
         self,
@@ -571,10 +548,9 @@ class Query:
               }
             }
         """
-        async for session in get_session():
-            # Get the authenticated user from the request context
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user, resolved once per request by the context getter
+            user = info.context["user"]
 
             if not user:
                 msg = "Authentication required"
@@ -599,8 +575,6 @@ class Query:
 
             return [Organization.from_model(org) for org in organization_models]
 
-        return []
-
     @strawberry.field
     async def organization(
         self, info: strawberry.types.Info, id: strawberry.ID
@@ -630,18 +604,17 @@ class Query:
               }
             }
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
+                # Authenticated user, resolved once per request by the context getter
+                user = info.context["user"]
 
                 if not user:
                     msg = "Authentication required"
                     raise ValueError(msg)
 
                 user_id = user.id
-                organization_id = UUID(str(id))
+                organization_id = UUID(id)
 
                 # Check if user is a member of the organization
                 member_stmt = select(OrganizationMemberModel).where(
@@ -656,9 +629,7 @@ class Query:
                     raise ValueError(msg)
 
                 # Get the organization
-                stmt = select(OrganizationModel).where(OrganizationModel.id == organization_id)
-                result = await session.execute(stmt)
-                organization_model = result.scalar_one_or_none()
+                organization_model = await session.get(OrganizationModel, organization_id)
 
                 if organization_model:
                     return Organization.from_model(organization_model)
@@ -668,8 +639,6 @@ class Query:
                 # Invalid UUID format or access denied
                 return None
 
-        return None
-
     @strawberry.field
     async def organization_members(
         self,
@@ -703,18 +672,17 @@ class Query:
               }
             }
         """
-        async for session in get_session():
+        async with session_scope() as session:
             try:
-                # Get the authenticated user from the request context
-                request = info.context["request"]
-                user = getattr(request.state, "user", None)
+                # Authenticated user, resolved once per request by the context getter
+                user = info.context["user"]
 
                 if not user:
                     msg = "Authentication required"
                     raise ValueError(msg)
 
                 user_id = user.id
-                org_id = UUID(str(organization_id))
+                org_id = UUID(organization_id)
 
                 # Check if user is a member of the organization
                 member_stmt = select(OrganizationMemberModel).where(
@@ -746,8 +714,6 @@ class Query:
                 # Invalid UUID format or access denied
                 return []
 
-        return []
-
     @strawberry.field
     async def dashboard_stats(
         self,
@@ -779,10 +745,9 @@ class Query:
               }
             }
         """
-        async for session in get_session():
-            # Get the authenticated user from the request context
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
+        async with session_scope() as session:
+            # Authenticated user, resolved once per request by the context getter
+            user = info.context["user"]
 
             if not user:
                 return DashboardStats(
@@ -793,7 +758,7 @@ class Query:
                 )
 
             user_id = user.id
-            org_id = UUID(str(organization_id)) if organization_id else None
+            org_id = UUID(organization_id) if organization_id else None
 
             # Get accessible space IDs (where user is owner or member)
             space_ids_stmt = (
@@ -854,10 +819,3 @@ class Query:
                 total_threads=thread_count,
                 threads_this_month=threads_this_month,
             )
-
-        return DashboardStats(
-            total_documents=0,
-            total_spaces=0,
-            total_threads=0,
-            threads_this_month=0,
-        )
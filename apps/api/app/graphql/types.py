@@ -22,6 +22,16 @@ from app.models.user import User as UserModel
 class User:
     """GraphQL User type."""
 
+    __slots__ = (
+        "avatar_url",
+        "bio",
+        "created_at",
+        "email",
+        "full_name",
+        "id",
+        "updated_at",
+    )
+
     id: strawberry.ID
     email: str
     full_name: str | None
@@ -263,6 +273,21 @@ class SearchDocumentsInput:
 class Space:
     """GraphQL Space type."""
 
+    __slots__ = (
+        "created_at",
+        "description",
+        "document_count",
+        "icon_color",
+        "id",
+        "is_public",
+        "max_members",
+        "member_count",
+        "name",
+        "owner_id",
+        "slug",
+        "updated_at",
+    )
+
     id: strawberry.ID
     name: str
     slug: str
@@ -361,6 +386,30 @@ class UpdateThreadInput:
 class Thread:
     """GraphQL Thread type for AI agent conversation threads."""
 
+    __slots__ = (
+        "agent_steps",
+        "completed_at",
+        "confidence_score",
+        "context",
+        "cost_usd",
+        "created_at",
+        "created_by",
+        "error_message",
+        "id",
+        "messages",
+        "model_used",
+        "organization_id",
+        "processing_time_ms",
+        "query_text",
+        "result",
+        "sources",
+        "space_id",
+        "status",
+        "title",
+        "tokens_used",
+        "updated_at",
+    )
+
     id: strawberry.ID
     organization_id: strawberry.ID
     space_id: strawberry.ID | None  # Optional: threads can be org-wide
@@ -448,7 +497,7 @@ class Message:
             thread_id=strawberry.ID(str(message.thread_id)),
             message_role=MessageRole[message.message_role.name],
             content=message.content,
-            message_metadata=message.message_metadata,
+            message_metadata=message.message_metadata or {},
             created_at=message.created_at,
             updated_at=message.updated_at,
         )
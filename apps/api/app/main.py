@@ -4,6 +4,8 @@ FastAPI main application module
 
 import logging
 import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
 from fastapi import FastAPI
@@ -12,11 +14,14 @@ from fastapi.openapi.utils import get_openapi
 from strawberry.fastapi import GraphQLRouter
 
 from app.config import settings
+from app.db.session import close_db, warm_up_pool
 from app.graphql import schema
+from app.graphql.context import get_context
 from app.middleware.auth import AuthenticationMiddleware
 from app.routes import health
 from app.routes.auth import router as auth_router
 from app.routes.documents import router as documents_router
+from app.routes.graphql_batch import router as graphql_batch_router
 from app.routes.thread_stream import router as thread_stream_router
 
 
@@ -55,6 +60,25 @@ def configure_logging() -> None:
     print("Logging configured: INFO level enabled for app modules", flush=True)
 
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Warm the database pool before serving traffic and dispose of it on shutdown."""
+    if settings.db_pool_warmup:
+        try:
+            await warm_up_pool(min(settings.db_pool_warmup_connections, settings.db_pool_size))
+        except Exception:
+            logger.warning(
+                "Database pool warm-up failed; connections will open on demand", exc_info=True
+            )
+
+    yield
+
+    await close_db()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
 
@@ -68,6 +92,7 @@ def create_app() -> FastAPI:
         docs_url="/docs" if settings.debug else None,
         redoc_url="/redoc" if settings.debug else None,
         openapi_url="/openapi.json" if settings.debug else None,
+        lifespan=lifespan,
     )
 
     # Add CORS middleware
@@ -84,7 +109,9 @@ def create_app() -> FastAPI:
 
     # Create GraphQL router
     graphql_app: GraphQLRouter = GraphQLRouter(
-        schema, graphql_ide="graphiql" if settings.debug else None
+        schema,
+        graphql_ide="graphiql" if settings.debug else None,
+        context_getter=get_context,
     )
 
     # Include routers
@@ -92,6 +119,7 @@ def create_app() -> FastAPI:
     app.include_router(documents_router)
     app.include_router(thread_stream_router)
     app.include_router(health.router)
+    app.include_router(graphql_batch_router)
     app.include_router(graphql_app, prefix="/graphql")
 
     @app.get("/", tags=["root"])
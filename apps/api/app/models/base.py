@@ -18,6 +18,10 @@ class Base(DeclarativeBase):
     def __tablename__(cls) -> str:  # noqa: N805
         return cls.__name__.lower() + "s"
 
+    # Fetch server-generated columns (created_at/updated_at) with INSERT/UPDATE ... RETURNING
+    # so instances are complete after flush without a follow-up refresh()
+    __mapper_args__ = {"eager_defaults": True}
+
     # Common fields for all models
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid4, index=True
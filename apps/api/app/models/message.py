@@ -3,7 +3,7 @@
 from enum import Enum as PyEnum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Enum as SQLEnum, ForeignKey, Text
+from sqlalchemy import Enum as SQLEnum, ForeignKey, Index, Text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -28,7 +28,7 @@ class Message(Base):
     Enables ChatGPT-style follow-up questions within the same thread.
     Each message represents one turn in the conversation (user question or AI response).
 
-    Metadata structure in JSONB:
+    Metadata structure in JSONB (NULL means no metadata; treat it as {}):
     {
         "citations": [...],           # Document citations for this specific message
         "confidence_score": 0.85,     # Confidence for this response
@@ -41,11 +41,11 @@ class Message(Base):
     __tablename__ = "messages"
 
     # Foreign key to thread (CASCADE delete)
+    # Indexed via the composite (thread_id, created_at) index below
     thread_id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("threads.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     # Message role using message_role enum
@@ -58,18 +58,15 @@ class Message(Base):
     content: Mapped[str] = mapped_column(Text, nullable=False)
 
     # Message metadata for citations, confidence, model info (mapped to 'metadata' column)
-    # Using lambda to avoid shared mutable default (Copilot suggestion)
-    message_metadata: Mapped[dict] = mapped_column(
-        "metadata",
-        JSONB,
-        nullable=False,
-        default=lambda: {},  # noqa: PIE807
-        server_default="{}",
-    )
+    # Nullable so messages without metadata (e.g. user turns) don't store an empty JSONB
+    message_metadata: Mapped[dict | None] = mapped_column("metadata", JSONB, nullable=True)
 
     # Relationships
     thread: Mapped["Thread"] = relationship("Thread", back_populates="messages")
 
+    # Indexes
+    __table_args__ = (Index("idx_messages_created_at", "thread_id", "created_at"),)
+
     def __repr__(self) -> str:
         """String representation of the message."""
         content_preview = self.content[:50] + "..." if len(self.content) > 50 else self.content
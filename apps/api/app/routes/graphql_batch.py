@@ -0,0 +1,75 @@
+"""
+Batched GraphQL endpoint.
+
+Accepts an array of GraphQL operations in one POST (Apollo BatchHttpLink style) so
+clients issuing many small mutations, e.g. adding members during organization
+onboarding, pay for one HTTP round-trip and one authentication pass instead of N.
+"""
+
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, status
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.graphql import schema
+from app.graphql.context import get_context
+
+router = APIRouter(prefix="/graphql", tags=["graphql"])
+
+# Upper bound on operations per batch, so one request cannot monopolise a worker
+MAX_BATCH_SIZE = 50
+
+
+class GraphQLOperation(BaseModel):
+    """A single operation within a batched GraphQL request."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    query: str
+    variables: dict[str, Any] | None = None
+    operation_name: str | None = Field(default=None, alias="operationName")
+
+
+@router.post("/batch")
+async def execute_batch(
+    request: Request, operations: list[GraphQLOperation]
+) -> list[dict[str, Any]]:
+    """
+    Execute a batch of GraphQL operations with a shared context.
+
+    All operations share one context, so the authenticated user is resolved once
+    and DataLoader caches (e.g. user lookups) carry over from one operation to the
+    next. Operations run in order, so a later mutation can depend on an earlier one.
+
+    Args:
+        request: Incoming HTTP request (carries the authenticated user on request.state)
+        operations: GraphQL operations to execute
+
+    Returns:
+        One GraphQL response (data and errors) per operation, in request order
+
+    Raises:
+        HTTPException: If the batch is empty or exceeds MAX_BATCH_SIZE
+    """
+    if not operations or len(operations) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch must contain between 1 and {MAX_BATCH_SIZE} operations",
+        )
+
+    context = await get_context(request)
+
+    responses: list[dict[str, Any]] = []
+    for operation in operations:
+        result = await schema.execute(
+            operation.query,
+            variable_values=operation.variables,
+            context_value=context,
+            operation_name=operation.operation_name,
+        )
+        response: dict[str, Any] = {"data": result.data}
+        if result.errors:
+            response["errors"] = [error.formatted for error in result.errors]
+        responses.append(response)
+
+    return responses
@@ -352,7 +352,6 @@ class AIAgentService:
                     thread_id=thread_id,
                     message_role=MessageRole.USER,
                     content=query,
-                    message_metadata={},
                 )
                 db.add(user_message)
                 await db.commit()
@@ -404,7 +403,6 @@ class AIAgentService:
                 thread_id=thread_record.id,
                 message_role=MessageRole.USER,
                 content=query,
-                message_metadata={},
             )
             db.add(user_message)
             await db.commit()
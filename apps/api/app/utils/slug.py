@@ -1,11 +1,7 @@
 """Utility functions for generating URL-safe slugs."""
 
 import re
-import uuid
-from typing import TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from sqlalchemy.ext.asyncio import AsyncSession
+import secrets
 
 
 def slugify(text: str, max_length: int = 100) -> str:
@@ -47,56 +43,17 @@ def slugify(text: str, max_length: int = 100) -> str:
     return slug
 
 
-async def generate_unique_slug(
-    base_text: str, db: "AsyncSession", model_class: type, slug_field: str = "slug"
-) -> str:
+def suffixed_slug(base_slug: str) -> str:
     """
-    Generate a unique slug by appending a suffix if necessary.
+    Append a short random suffix to a slug.
+
+    Used to retry an insert whose slug collided without probing the table for
+    a free numbered variant.
 
     Args:
-        base_text: The text to create a slug from
-        db: Database session
-        model_class: SQLAlchemy model class to check against
-        slug_field: Name of the slug field in the model (default "slug")
+        base_slug: The slug that collided
 
     Returns:
-        A unique slug that doesn't exist in the database
-
-    Example:
-        If "my-space" exists, returns "my-space-1"
-        If "my-space-1" exists, returns "my-space-2"
+        The slug with a 6-character hex suffix, e.g. "my-space-3f9a1c"
     """
-    from sqlalchemy import Select, select
-
-    base_slug = slugify(base_text)
-
-    # If slug is empty after slugification, use a random UUID
-    if not base_slug:
-        return str(uuid.uuid4())[:8]
-
-    # Check if base slug exists
-    stmt: Select = select(model_class).where(getattr(model_class, slug_field) == base_slug)
-    result = await db.execute(stmt)
-    existing = result.scalar_one_or_none()
-
-    if not existing:
-        return base_slug
-
-    # If it exists, find all matching slugs in a single query
-    # Query for all slugs that start with base_slug (including numbered variants)
-    stmt = select(getattr(model_class, slug_field)).where(
-        getattr(model_class, slug_field).like(f"{base_slug}%")
-    )
-    result = await db.execute(stmt)
-    existing_slugs = {row[0] for row in result.fetchall()}
-
-    # Find the next available counter by checking which numbers are taken
-    counter = 1
-    while counter <= 1000:
-        candidate_slug = f"{base_slug}-{counter}"
-        if candidate_slug not in existing_slugs:
-            return candidate_slug
-        counter += 1
-
-    # Fallback to UUID if we can't find a unique slug after 1000 attempts
-    return f"{base_slug}-{uuid.uuid4().hex[:6]}"
+    return f"{base_slug}-{secrets.token_hex(3)}"
@@ -4,6 +4,7 @@ Test Configuration and Fixtures
 This module provides pytest fixtures for testing with mocked dependencies.
 """
 
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, MagicMock
 from uuid import uuid4
 
@@ -155,6 +156,7 @@ def mock_db_session():
     session.delete = AsyncMock()
     session.flush = AsyncMock()
     session.execute = AsyncMock()
+    session.get = AsyncMock()
     return session
 
 
@@ -164,7 +166,10 @@ def mock_info(mock_user):
     mock_request = MagicMock()
     mock_request.state.user = mock_user
     mock_info = MagicMock()
-    mock_info.context = {"request": mock_request}
+    mock_info.context = {
+        "request": mock_request,
+        "user": mock_user,
+    }
     return mock_info
 
 
@@ -174,18 +179,27 @@ def mock_info_no_auth():
     mock_request = MagicMock()
     mock_request.state.user = None
     mock_info = MagicMock()
-    mock_info.context = {"request": mock_request}
+    mock_info.context = {
+        "request": mock_request,
+        "user": None,
+    }
     return mock_info
 
 
 @pytest.fixture()
-def mock_get_session(mock_db_session):
-    """Create a mock get_session generator for patching."""
-
-    async def _mock_get_session():
-        yield mock_db_session
-
-    return _mock_get_session
+def mock_session_scope(mock_db_session):
+    """Create a mock session_scope context manager for patching."""
+
+    @asynccontextmanager
+    async def _mock_session_scope():
+        # Mirror session_scope: roll back if the block raises
+        try:
+            yield mock_db_session
+        except Exception:
+            await mock_db_session.rollback()
+            raise
+
+    return _mock_session_scope
 
 
 @pytest.fixture()
@@ -10,10 +10,12 @@ import pytest
 
 from app.agents.thread_agent import (
     add_citations,
+    count_tokens,
     create_thread_agent,
     extract_citations,
     generate_response,
     retrieve_context,
+    trim_context_to_budget,
 )
 from app.services.ai_agent import AIAgentService, ai_agent_service
 from app.services.vector_search_service import SearchResult
@@ -77,6 +79,18 @@ class TestThreadAgent:
         assert citations[1]["index"] == 2
         assert citations[1]["text"] == context[1]
 
+    def test_extract_citations_deduplicates_repeated_markers(self) -> None:
+        """Test repeated citation markers produce one citation each, in order."""
+        response = "AI is used in finance [2]. It is powerful [1]. See [2] and [01] again."
+        context = [
+            "AI is a powerful technology.",
+            "AI has applications in healthcare, finance, and more.",
+        ]
+
+        citations = extract_citations(response, context)
+
+        assert [c["index"] for c in citations] == [2, 1]
+
     def test_extract_citations_no_references(self) -> None:
         """Test citation extraction with no references."""
         response = "AI is artificial intelligence."
@@ -96,6 +110,17 @@ class TestThreadAgent:
         # Should not extract citation for out-of-range index
         assert len(citations) == 0
 
+    def test_trim_context_truncates_single_oversized_chunk(self) -> None:
+        """Test an over-budget single chunk is truncated instead of dropped."""
+        chunk = "Artificial intelligence is transforming every industry. " * 50
+
+        chunks, results = trim_context_to_budget([chunk], None, max_tokens=20)
+
+        assert len(chunks) == 1
+        assert chunk.startswith(chunks[0])
+        assert 0 < count_tokens(chunks[0]) <= 20
+        assert results is None
+
     @pytest.mark.asyncio
     async def test_add_citations(self) -> None:
         """Test adding citations to agent state."""
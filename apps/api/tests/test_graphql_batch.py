@@ -0,0 +1,60 @@
+"""
+Tests for the batched GraphQL endpoint
+"""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes.graphql_batch import MAX_BATCH_SIZE
+
+client = TestClient(app)
+
+
+class TestGraphQLBatch:
+    """Test POST /graphql/batch"""
+
+    def test_executes_operations_in_order(self):
+        """Each operation gets its own response, in request order"""
+        response = client.post(
+            "/graphql/batch",
+            json=[
+                {"query": "query First { __typename }", "operationName": "First"},
+                {"query": "mutation { __typename }"},
+            ],
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"data": {"__typename": "Query"}},
+            {"data": {"__typename": "Mutation"}},
+        ]
+
+    def test_errors_are_reported_per_operation(self):
+        """A failing operation does not affect the others in the batch"""
+        response = client.post(
+            "/graphql/batch",
+            json=[
+                {"query": 'mutation { deleteThread(id: "x") }'},
+                {"query": "{ __typename }"},
+            ],
+        )
+
+        assert response.status_code == 200
+        failed, succeeded = response.json()
+        assert failed["data"] is None
+        assert failed["errors"][0]["message"] == "Authentication required"
+        assert succeeded == {"data": {"__typename": "Query"}}
+
+    def test_rejects_empty_batch(self):
+        """An empty batch is a client error"""
+        response = client.post("/graphql/batch", json=[])
+
+        assert response.status_code == 400
+
+    def test_rejects_oversized_batch(self):
+        """Batches above MAX_BATCH_SIZE are rejected before anything executes"""
+        operations = [{"query": "{ __typename }"}] * (MAX_BATCH_SIZE + 1)
+
+        response = client.post("/graphql/batch", json=operations)
+
+        assert response.status_code == 400
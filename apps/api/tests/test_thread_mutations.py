@@ -4,8 +4,11 @@ from unittest.mock import MagicMock, patch
 from uuid import uuid4
 
 import pytest
+from sqlalchemy.exc import IntegrityError
 
+from app.graphql.errors import AuthorizationError
 from app.graphql.mutation import Mutation
+from app.graphql.schema import schema
 from app.graphql.types import CreateThreadInput, UpdateThreadInput
 
 
@@ -14,12 +17,18 @@ class TestThreadMutations:
 
     @pytest.mark.asyncio
     async def test_create_thread_with_organization_and_space(
-        self, mock_info, mock_db_session, mock_user, mock_organization, mock_space, mock_get_session
+        self,
+        mock_info,
+        mock_db_session,
+        mock_user,
+        mock_organization,
+        mock_space,
+        mock_session_scope,
     ):
         """Test creating a thread with organization_id and space_id."""
-        # Mock space query result
+        # Mock space + membership query result (user owns the space, no member row)
         mock_space_result = MagicMock()
-        mock_space_result.scalar_one_or_none = MagicMock(return_value=mock_space)
+        mock_space_result.first = MagicMock(return_value=(mock_space, None))
         mock_db_session.execute.return_value = mock_space_result
 
         input_data = CreateThreadInput(
@@ -29,7 +38,7 @@ class TestThreadMutations:
             title="Test Thread",
         )
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             result = await mutation.create_thread(mock_info, input_data)
 
@@ -43,7 +52,7 @@ class TestThreadMutations:
 
     @pytest.mark.asyncio
     async def test_create_org_wide_thread_no_space(
-        self, mock_info, mock_db_session, mock_user, mock_organization, mock_get_session
+        self, mock_info, mock_db_session, mock_user, mock_organization, mock_session_scope
     ):
         """Test creating an org-wide thread without space_id (space_id = None)."""
         input_data = CreateThreadInput(
@@ -53,7 +62,7 @@ class TestThreadMutations:
             title="Org-Wide Thread",
         )
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             result = await mutation.create_thread(mock_info, input_data)
 
@@ -76,18 +85,35 @@ class TestThreadMutations:
             query_text="Unauthenticated query",
         )
 
-        mutation = Mutation()
-        with pytest.raises(ValueError, match="Authentication required"):
-            await mutation.create_thread(mock_info_no_auth, input_data)
+        document = """
+            mutation CreateThread($input: CreateThreadInput!) {
+                createThread(input: $input) { id }
+            }
+        """
+        variables = {
+            "input": {
+                "organizationId": input_data.organization_id,
+                "spaceId": input_data.space_id,
+                "queryText": input_data.query_text,
+            }
+        }
+
+        with patch("app.graphql.mutation.session_scope") as mock_scope:
+            result = await schema.execute(
+                document, variable_values=variables, context_value=mock_info_no_auth.context
+            )
+
+        assert result.errors[0].message == "Authentication required"
+        assert not mock_scope.called
 
     @pytest.mark.asyncio
     async def test_create_thread_space_not_found(
-        self, mock_info, mock_db_session, mock_user, mock_organization, mock_get_session
+        self, mock_info, mock_db_session, mock_user, mock_organization, mock_session_scope
     ):
         """Test creating a thread fails with 'Space not found' when space doesn't exist."""
         # Mock space not found
         mock_space_result = MagicMock()
-        mock_space_result.scalar_one_or_none = MagicMock(return_value=None)
+        mock_space_result.first = MagicMock(return_value=None)
         mock_db_session.execute.return_value = mock_space_result
 
         nonexistent_space_id = str(uuid4())
@@ -97,29 +123,57 @@ class TestThreadMutations:
             query_text="Query with bad space",
         )
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             with pytest.raises(ValueError, match="Space not found"):
                 await mutation.create_thread(mock_info, input_data)
 
             assert mock_db_session.rollback.called
 
+    @pytest.mark.asyncio
+    async def test_create_thread_invalid_organization_foreign_key(
+        self, mock_info, mock_db_session, mock_organization, mock_session_scope
+    ):
+        """Test a foreign key violation on organization_id maps to a friendly error."""
+
+        class ForeignKeyViolationError(Exception):
+            constraint_name = "fk_threads_organization_id"
+
+        # SQLAlchemy's asyncpg adapter exposes sqlstate and chains the driver error
+        driver_error = MagicMock(sqlstate="23503")
+        driver_error.__cause__ = ForeignKeyViolationError()
+        mock_db_session.commit.side_effect = IntegrityError("INSERT ...", {}, driver_error)
+
+        input_data = CreateThreadInput(
+            organization_id=str(mock_organization.id),
+            query_text="Org-wide query",
+        )
+
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
+            mutation = Mutation()
+            with pytest.raises(ValueError, match="Invalid organization specified"):
+                await mutation.create_thread(mock_info, input_data)
+
+            assert mock_db_session.rollback.called
+
     @pytest.mark.asyncio
     async def test_create_thread_insufficient_permissions(
-        self, mock_info, mock_db_session, mock_user, mock_organization, mock_space, mock_get_session
+        self,
+        mock_info,
+        mock_db_session,
+        mock_user,
+        mock_organization,
+        mock_space,
+        mock_session_scope,
     ):
         """Test creating a thread fails with 'Insufficient permissions' when user is not owner/member."""
         # Mock space exists but user is not owner/member
         mock_space.owner_id = uuid4()  # Different user
 
+        # Mock space + membership query result (user is not a member)
         mock_space_result = MagicMock()
-        mock_space_result.scalar_one_or_none = MagicMock(return_value=mock_space)
-
-        # Mock member check - user is not a member
-        mock_member_result = MagicMock()
-        mock_member_result.scalar_one_or_none = MagicMock(return_value=None)
-
-        mock_db_session.execute.side_effect = [mock_space_result, mock_member_result]
+        mock_space_result.first = MagicMock(return_value=(mock_space, None))
+        mock_db_session.execute.return_value = mock_space_result
 
         input_data = CreateThreadInput(
             organization_id=str(mock_organization.id),
@@ -127,10 +181,10 @@ class TestThreadMutations:
             query_text="Unauthorized query",
         )
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             with pytest.raises(
-                ValueError, match="Insufficient permissions to create thread in this space"
+                AuthorizationError, match="Insufficient permissions to create thread in this space"
             ):
                 await mutation.create_thread(mock_info, input_data)
 
@@ -138,51 +192,98 @@ class TestThreadMutations:
 
     @pytest.mark.asyncio
     async def test_update_thread_success(
-        self, mock_info, mock_db_session, mock_user, mock_thread, mock_space, mock_get_session
+        self, mock_info, mock_db_session, mock_user, mock_thread, mock_space, mock_session_scope
     ):
         """Test updating a thread successfully."""
-        # Mock thread query result
+        # Mock thread access query result (creator is authorized without the space)
         mock_thread_result = MagicMock()
-        mock_thread_result.scalar_one_or_none = MagicMock(return_value=mock_thread)
-
-        # Mock space query result (update_thread queries for space to check permissions)
-        mock_space_result = MagicMock()
-        mock_space_result.scalar_one_or_none = MagicMock(return_value=mock_space)
-
-        mock_db_session.execute.side_effect = [mock_thread_result, mock_space_result]
+        mock_thread_result.first = MagicMock(return_value=(mock_thread, mock_space, False))
+        mock_db_session.execute.return_value = mock_thread_result
 
         input_data = UpdateThreadInput(title="Updated Title", result="Updated result")
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             result = await mutation.update_thread(mock_info, str(mock_thread.id), input_data)
 
             assert result is not None
             assert mock_thread.title == "Updated Title"
             assert mock_thread.result == "Updated result"
+            assert mock_db_session.execute.await_count == 1
             assert mock_db_session.commit.called
 
+    @pytest.mark.asyncio
+    async def test_update_thread_no_changes_skips_commit(
+        self, mock_info, mock_db_session, mock_thread, mock_space, mock_session_scope
+    ):
+        """Test an update with no provided fields returns the thread without committing."""
+        mock_thread_result = MagicMock()
+        mock_thread_result.first = MagicMock(return_value=(mock_thread, mock_space, False))
+        mock_db_session.execute.return_value = mock_thread_result
+
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
+            mutation = Mutation()
+            result = await mutation.update_thread(
+                mock_info, str(mock_thread.id), UpdateThreadInput()
+            )
+
+            assert result is not None
+            assert not mock_db_session.commit.called
+
+    @pytest.mark.asyncio
+    async def test_update_thread_insufficient_permissions(
+        self, mock_info, mock_db_session, mock_thread, mock_space, mock_session_scope
+    ):
+        """Test updating a space thread fails when user is neither creator nor space owner."""
+        mock_thread.created_by = uuid4()
+        mock_space.owner_id = uuid4()
+
+        # Mock thread access query result (space is joined onto the thread)
+        mock_thread_result = MagicMock()
+        mock_thread_result.first = MagicMock(return_value=(mock_thread, mock_space, False))
+        mock_db_session.execute.return_value = mock_thread_result
+
+        input_data = UpdateThreadInput(title="Hijacked Title")
+
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
+            mutation = Mutation()
+            with pytest.raises(
+                AuthorizationError, match="Insufficient permissions to update this thread"
+            ):
+                await mutation.update_thread(mock_info, str(mock_thread.id), input_data)
+
+            assert mock_db_session.rollback.called
+
     @pytest.mark.asyncio
     async def test_update_thread_unauthenticated(self, mock_info_no_auth, mock_thread):
         """Test updating a thread fails with 'Authentication required' when not authenticated."""
-        input_data = UpdateThreadInput(title="Hacked Title")
+        document = """
+            mutation UpdateThread($id: ID!, $input: UpdateThreadInput!) {
+                updateThread(id: $id, input: $input) { id }
+            }
+        """
+        variables = {"id": str(mock_thread.id), "input": {"title": "Hacked Title"}}
+
+        with patch("app.graphql.mutation.session_scope") as mock_scope:
+            result = await schema.execute(
+                document, variable_values=variables, context_value=mock_info_no_auth.context
+            )
 
-        mutation = Mutation()
-        with pytest.raises(ValueError, match="Authentication required"):
-            await mutation.update_thread(mock_info_no_auth, str(mock_thread.id), input_data)
+        assert result.errors[0].message == "Authentication required"
+        assert not mock_scope.called
 
     @pytest.mark.asyncio
-    async def test_update_thread_not_found(self, mock_info, mock_db_session, mock_get_session):
+    async def test_update_thread_not_found(self, mock_info, mock_db_session, mock_session_scope):
         """Test updating a thread fails with 'Thread not found' when thread doesn't exist."""
         # Mock thread not found
         mock_thread_result = MagicMock()
-        mock_thread_result.scalar_one_or_none = MagicMock(return_value=None)
+        mock_thread_result.first = MagicMock(return_value=None)
         mock_db_session.execute.return_value = mock_thread_result
 
         nonexistent_id = str(uuid4())
         input_data = UpdateThreadInput(title="New Title")
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             with pytest.raises(ValueError, match="Thread not found"):
                 await mutation.update_thread(mock_info, nonexistent_id, input_data)
@@ -191,71 +292,97 @@ class TestThreadMutations:
 
     @pytest.mark.asyncio
     async def test_delete_thread_success_by_creator(
-        self, mock_info, mock_db_session, mock_user, mock_thread, mock_space, mock_get_session
+        self, mock_info, mock_db_session, mock_user, mock_thread, mock_space, mock_session_scope
     ):
         """Test deleting a space thread successfully by creator."""
-        # Mock thread query result
+        # Mock authorization columns (creator, space, space owner, is_member, is_org_admin)
         mock_thread_result = MagicMock()
-        mock_thread_result.scalar_one_or_none = MagicMock(return_value=mock_thread)
-
-        # Mock space query result
-        mock_space_result = MagicMock()
-        mock_space_result.scalar_one_or_none = MagicMock(return_value=mock_space)
-
-        # Mock member query result (third query in delete_thread)
-        mock_member_result = MagicMock()
-        mock_member_result.scalar_one_or_none = MagicMock(return_value=None)
-
-        mock_db_session.execute.side_effect = [
-            mock_thread_result,
-            mock_space_result,
-            mock_member_result,
-        ]
+        mock_thread_result.first = MagicMock(
+            return_value=(mock_thread.created_by, mock_space.id, mock_space.owner_id, False, False)
+        )
+        mock_db_session.execute.return_value = mock_thread_result
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             result = await mutation.delete_thread(mock_info, str(mock_thread.id))
 
             assert result is True
-            assert mock_db_session.delete.called
+            assert mock_db_session.execute.await_args.args[0].is_delete
             assert mock_db_session.commit.called
 
     @pytest.mark.asyncio
     async def test_delete_org_thread_success(
-        self, mock_info, mock_db_session, mock_user, mock_org_thread, mock_get_session
+        self, mock_info, mock_db_session, mock_user, mock_org_thread, mock_session_scope
     ):
         """Test deleting an org-wide thread successfully by creator."""
-        # Mock thread query result
+        # Mock thread query result (org-wide: no space or membership)
+        mock_thread_result = MagicMock()
+        mock_thread_result.first = MagicMock(
+            return_value=(mock_org_thread.created_by, None, None, False, False)
+        )
+        mock_db_session.execute.return_value = mock_thread_result
+
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
+            mutation = Mutation()
+            result = await mutation.delete_thread(mock_info, str(mock_org_thread.id))
+
+            assert result is True
+            assert mock_db_session.execute.await_args.args[0].is_delete
+            assert mock_db_session.commit.called
+
+    @pytest.mark.asyncio
+    async def test_delete_org_thread_by_org_admin(
+        self, mock_info, mock_db_session, mock_org_thread, mock_session_scope
+    ):
+        """Test an org admin can delete another user's org-wide thread in two queries."""
+        mock_org_thread.created_by = uuid4()
+
+        # Thread row with the org admin flag set
         mock_thread_result = MagicMock()
-        mock_thread_result.scalar_one_or_none = MagicMock(return_value=mock_org_thread)
+        mock_thread_result.first = MagicMock(
+            return_value=(mock_org_thread.created_by, None, None, False, True)
+        )
         mock_db_session.execute.return_value = mock_thread_result
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             result = await mutation.delete_thread(mock_info, str(mock_org_thread.id))
 
             assert result is True
-            assert mock_db_session.delete.called
+            # One authorization query, then the DELETE
+            assert mock_db_session.execute.await_count == 2
             assert mock_db_session.commit.called
 
     @pytest.mark.asyncio
     async def test_delete_thread_unauthenticated(self, mock_info_no_auth, mock_thread):
         """Test deleting a thread fails with 'Authentication required' when not authenticated."""
-        mutation = Mutation()
-        with pytest.raises(ValueError, match="Authentication required"):
-            await mutation.delete_thread(mock_info_no_auth, str(mock_thread.id))
+        document = """
+            mutation DeleteThread($id: ID!) {
+                deleteThread(id: $id)
+            }
+        """
+
+        with patch("app.graphql.mutation.session_scope") as mock_scope:
+            result = await schema.execute(
+                document,
+                variable_values={"id": str(mock_thread.id)},
+                context_value=mock_info_no_auth.context,
+            )
+
+        assert result.errors[0].message == "Authentication required"
+        assert not mock_scope.called
 
     @pytest.mark.asyncio
-    async def test_delete_thread_not_found(self, mock_info, mock_db_session, mock_get_session):
+    async def test_delete_thread_not_found(self, mock_info, mock_db_session, mock_session_scope):
         """Test deleting a thread fails with 'Thread not found' when thread doesn't exist."""
         # Mock thread not found
         mock_thread_result = MagicMock()
-        mock_thread_result.scalar_one_or_none = MagicMock(return_value=None)
+        mock_thread_result.first = MagicMock(return_value=None)
         mock_db_session.execute.return_value = mock_thread_result
 
         nonexistent_id = str(uuid4())
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             with pytest.raises(ValueError, match="Thread not found"):
                 await mutation.delete_thread(mock_info, nonexistent_id)
@@ -264,26 +391,23 @@ class TestThreadMutations:
 
     @pytest.mark.asyncio
     async def test_delete_org_thread_only_creator_can_delete(
-        self, mock_info, mock_db_session, mock_user, mock_org_thread, mock_get_session
+        self, mock_info, mock_db_session, mock_user, mock_org_thread, mock_session_scope
     ):
         """Test deleting an org-wide thread fails when not creator and not org admin."""
         # Mock org thread with different creator
         mock_org_thread.created_by = uuid4()
 
+        # Thread row with the org admin flag unset (user is not an org admin)
         mock_thread_result = MagicMock()
-        mock_thread_result.scalar_one_or_none = MagicMock(return_value=mock_org_thread)
-
-        # Mock org member result (user is not an org admin)
-        mock_org_member_result = MagicMock()
-        mock_org_member_result.scalar_one_or_none = MagicMock(return_value=None)
-
-        # Configure execute to return different results based on call order
-        mock_db_session.execute.side_effect = [mock_thread_result, mock_org_member_result]
+        mock_thread_result.first = MagicMock(
+            return_value=(mock_org_thread.created_by, None, None, False, False)
+        )
+        mock_db_session.execute.return_value = mock_thread_result
 
-        with patch("app.graphql.mutation.get_session", side_effect=mock_get_session):
+        with patch("app.graphql.mutation.session_scope", side_effect=mock_session_scope):
             mutation = Mutation()
             with pytest.raises(
-                ValueError,
+                AuthorizationError,
                 match="Only the creator or organization admin can delete org-wide threads",
             ):
                 await mutation.delete_thread(mock_info, str(mock_org_thread.id))